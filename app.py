@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import requests
 import base64
@@ -5,17 +6,25 @@ import html
 from datetime import datetime
 
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-from utils.github_api import set_token
-from utils.github_api import get_user_profile, get_user_repos, get_language_distribution
+# pandas, matplotlib, plotly and gemini are imported inside the pages that use them,
+# so cold starts and the Home page don't pay for them.
+from utils.github_api import set_token, get_client, get_app_client, get_http_cache_stats
+from utils.github_api import get_user_profile, get_user_language_distribution
 from utils.github_api import search_repositories_by_language
-from gemini import parse_user_prompt, get_filters, find_github_issues, summarize_issue
+from utils.profile_snapshot import refresh_profile_repos
+from utils.charts import language_pie_png, stars_bar_figure, commit_line_figure
+from utils.commit_stats import commit_counts, BUCKETS
+from utils.rerank import rerank
+from utils.metrics import metrics, start_exporters
+
+# Set COMMIT_CONNECT_ADMIN=1 to add a Metrics page to the sidebar
+ADMIN_PAGE = os.getenv("COMMIT_CONNECT_ADMIN", "") not in ("", "0")
 
 # Set Page Title and Layout
 st.set_page_config(page_title="Commit-Connect", page_icon="🔍", layout="wide")
 
+start_exporters()
+
 if "page" not in st.session_state:
     st.session_state.page = "Home"
     
@@ -159,30 +168,114 @@ def set_background():
 
 set_background()
 
-def display_issues(issues):
+# Issues summarized in the background when pre-summarization is on
+PRESUMMARIZE_TOP_K = 5
+# Issues drawn per page; only the visible page is rendered on a rerun
+ISSUES_PAGE_SIZE = 10
+PAGE_SIZE_OPTIONS = [5, 10, 25, 50]
+
+def render_summary(issue, future=None):
+    summary_key = f"summarized_text_{issue['id']}"
+    if summary_key not in st.session_state and future is not None and future.done() and future.exception() is None:
+        # ✅ A finished background summary shows up without a click
+        st.session_state[summary_key] = html.escape(future.result())
+    if summary_key in st.session_state:
+        st.write(st.session_state[summary_key])
+        return
+
+    if future is not None and not future.done():
+        st.caption("⏳ Summarizing in the background...")
+    if st.button("Click here to learn more!", key=f"learn_more_{issue['id']}"):
+        from gemini import stream_issue_summary, GeminiUnavailable
+
+        # Generate summary only once and store it, already escaped for display
+        try:
+            if future is None:
+                # 🌊 Show the summary as Gemini writes it
+                chunks = stream_issue_summary(issue['body'], issue_id=issue['id'])
+                summary = st.write_stream(html.escape(chunk) for chunk in chunks)
+                if summary:
+                    st.session_state[summary_key] = summary
+                else:
+                    st.warning("⚠️ Gemini returned no summary for this issue; please try again.")
+            else:
+                st.session_state[summary_key] = html.escape(get_summary(issue, future))
+                st.write(st.session_state[summary_key])
+        except GeminiUnavailable as e:
+            st.warning(f"⚠️ Couldn't summarize this issue: {e}")
+
+# A "Learn more" click reruns only that issue's summary, not the whole page
+summary_fragment = st.fragment(render_summary)
+
+@st.fragment(run_every=2)
+def live_summary(issue, future):
+    """Re-polls a pending background summary; once it is done, one full rerun redraws the card without polling."""
+    if future.done():
+        if future.exception() is not None:
+            # Don't resubmit it on the rerun; "Learn more" still summarizes it on demand
+            st.session_state.setdefault("presummarize_failed", set()).add(issue['id'])
+        st.rerun()
+    render_summary(issue, future)
+
+def get_summary(issue, future=None):
+    """Use the background summary if there is one, otherwise summarize now."""
+    from gemini import summarize_issue
+
+    if future is not None:
+        try:
+            return future.result()
+        except Exception:
+            pass
+    return summarize_issue(issue['body'], issue_id=issue['id'])
+
+def set_issue_page(page):
+    st.session_state.issue_page = page
+
+def display_issues(issues, presummarize=False, page_size=ISSUES_PAGE_SIZE):
+    from gemini import presummarize_issues
+
+    # 📄 Start from the first page whenever a different result list comes in
+    results_key = hash(tuple(issue['id'] for issue in issues))
+    if st.session_state.get("issue_results_key") != results_key:
+        st.session_state.issue_results_key = results_key
+        st.session_state.issue_page = 0
+    page_count = max(1, -(-len(issues) // page_size))
+    page = min(st.session_state.get("issue_page", 0), page_count - 1)
+    start = page * page_size
+    visible = issues[start:start + page_size]
+
     # --- Display Issues ---
-    counter = 1
-    for issue in issues:
+    pending = {}
+    if presummarize:
+        failed = st.session_state.get("presummarize_failed", set())
+        top = [issue for issue in visible[:PRESUMMARIZE_TOP_K]
+               if issue['id'] not in failed and f"summarized_text_{issue['id']}" not in st.session_state]
+        pending = presummarize_issues(top, k=PRESUMMARIZE_TOP_K)
+    for position, issue in enumerate(visible, start=start + 1):
         with st.container():
             
             st.markdown("<hr style='border: 1px solid #ccc;'>", unsafe_allow_html=True)
-            st.markdown(f"## Issue #{counter}")
+            st.markdown(f"## Issue #{position}")
             
             safe_title = html.escape(issue["title"])
             st.markdown(f"🔗 [{safe_title}]({issue['html_url']}) | 🏷️ Labels: {', '.join([label['name'] for label in issue['labels']]) if issue['labels'] else 'None'} | {issue['state'].capitalize()} | {"Assigned Already" if issue['assignees'] else 'Unassigned'}")
             if issue['body']:
-                summary_key = f"summarized_text_{counter}"
-                if summary_key not in st.session_state:
-                    if st.button("Click here to learn more!", key=f"Learn more {counter}"):
-                        # Generate summary only once and store it
-                        st.session_state[summary_key] = summarize_issue(issue['body'])
-                if summary_key in st.session_state:
-                    safe_desc = html.escape(st.session_state[summary_key])
-                    st.write(safe_desc)
-            counter += 1
+                future = pending.get(issue['id'])
+                if future is not None and not future.done():
+                    live_summary(issue, future)
+                else:
+                    summary_fragment(issue, future)
 
     st.markdown("---")
-    st.caption("All issues are displayed.")
+    if page_count == 1:
+        st.caption("All issues are displayed.")
+        return
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("◀ Previous", key="issues_prev", disabled=page == 0,
+                    on_click=set_issue_page, args=(page - 1,))
+    info_col.caption(f"Page {page + 1} of {page_count} · issues {start + 1}-{start + len(visible)} of {len(issues)}")
+    next_col.button("Next ▶", key="issues_next", disabled=page == page_count - 1,
+                    on_click=set_issue_page, args=(page + 1,))
 
 
 # Sidebar Navigation
@@ -200,6 +293,18 @@ with st.sidebar:
         st.session_state.page = "Find Projects"
     if st.button("Profile"):
         st.session_state.page = "Profile Visualization"
+    if ADMIN_PAGE and st.button("Metrics"):
+        st.session_state.page = "Metrics"
+
+    # Remaining GitHub API budget; searches run on the app token
+    budgets = get_client().rate_limit_status()
+    search_budget = get_app_client().rate_limit_status().get("search")
+    if search_budget:
+        budgets["search"] = search_budget
+    if budgets:
+        st.caption("GitHub API left: " + " | ".join(
+            f"{resource} {budget['remaining']}/{budget['limit']}" for resource, budget in sorted(budgets.items())
+        ))
 
 # Home Page
 if st.session_state.page == "Home":
@@ -325,53 +430,21 @@ elif st.session_state.page == "Your Top Languages":
     if "pat" in st.session_state and st.session_state.pat:
         pat = st.session_state.pat
 
-        # Fetch and process languages
-        repos = get_user_repos()
-        if repos:
-            lang_data = get_language_distribution(repos)
+        # Stream repositories into a language count
+        lang_data = get_user_language_distribution()
+        if lang_data is not None:
 
             if lang_data:
                 all_languages = sorted(lang_data, key=lang_data.get, reverse=True)
                 top_languages = all_languages[:3]
                 st.session_state.top_languages = top_languages  # Store it globally
                 st.session_state.all_languages = all_languages
+                st.session_state.language_distribution = lang_data
 
                 st.success(f"Top languages detected: {', '.join(top_languages)}")
 
-                # 🎨 Beautified Transparent Pie Chart
-                import matplotlib.pyplot as plt
-                import matplotlib as mpl
-
-                # Set a modern font theme
-                mpl.rcParams['font.family'] = 'sans-serif'
-                mpl.rcParams['font.size'] = 10
-
-                # Custom colors
-                colors = ["#FF6F61", "#6B5B95", "#88B04B", "#FFA07A", "#20B2AA", "#FFB347", "#779ECB"]
-
-                # Create Pie Chart with transparent background
-                fig, ax = plt.subplots(figsize=(6, 6), dpi=100, facecolor='none')
-                fig.patch.set_alpha(0.0)  # Transparent figure background
-                ax.set_facecolor('none')  # Transparent axis background
-
-                wedges, texts, autotexts = ax.pie(
-                    lang_data.values(),
-                    labels=lang_data.keys(),
-                    autopct="%1.1f%%",
-                    startangle=140,
-                    colors=colors[:len(lang_data)],
-                    wedgeprops={'edgecolor': 'white', 'linewidth': 2, 'antialiased': True},
-                    textprops={'fontsize': 10, 'color': 'white'}
-                )
-
-                for autotext in autotexts:
-                    autotext.set_color('white')
-                    autotext.set_weight('bold')
-                    autotext.set_size(9)
-
-                ax.axis("equal")
-                plt.title("Your Top Languages", fontsize=14, fontweight='bold', color="white")
-                st.pyplot(fig)
+                # 🎨 Pie chart, re-rendered only when the language counts change
+                st.image(language_pie_png(lang_data))
 
             else:
                 st.info("No language data found in your repositories.")
@@ -452,6 +525,9 @@ elif st.session_state.page == "Get Projects":
                 elif len(repos) == 0:
                     st.info("No repositories found.")
                 else:
+                    # 🎯 Best match ranks by fit with the user's languages instead of GitHub's order
+                    if sort_by is None:
+                        repos = rerank(repos, st.session_state.get("language_distribution"))
                     st.success(f"Found {len(repos)} repositories:")
                     for repo in repos:
                         st.markdown(
@@ -463,6 +539,8 @@ elif st.session_state.page == "Get Projects":
 
 # Find Projects Page
 elif st.session_state.page == "Find Projects":
+    from gemini import parse_user_prompt, get_filters, find_github_issues
+
     st.title(":material/search: Describe your idea, and let AI fetch relevant open-source issues you can start with.")
     prompt = st.text_input("What kind of projects are you looking for to contribute? ",placeholder="Can you suggest some beginner-friendly issues in Flask related projects?")
 
@@ -494,31 +572,47 @@ elif st.session_state.page == "Find Projects":
     # 🕒 Recently updated slider
     recent_days = st.slider("🕒 Updated within (days)", 0, 365, 90)
 
+    presummarize = st.toggle(f"⚡ Summarize the top {PRESUMMARIZE_TOP_K} issues of each page in the background")
+    page_size = st.selectbox("📄 Issues per page", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(ISSUES_PAGE_SIZE))
+
     if prompt:
         result = parse_user_prompt(prompt)
         #st.write(result)
         languages, frameworks_libraries, tools, difficulty, filters = get_filters(prompt)
         #query, query_url = build_issue_query(languages, frameworks_libraries, tools, difficulty, filters)
         #st.write(query)
-        json_data = find_github_issues(user_input=prompt,
-            state=state_filter,
-            assigned=assignment_filter,
-            recent_days=recent_days
-        )
-        total_issues = len(json_data)
+        # 📌 Reruns (paging, background summaries) reuse this search's results instead of searching again
+        search_key = (prompt, state_filter, assignment_filter, sort_by, order, recent_days)
+        if st.session_state.get("issue_search_key") == search_key:
+            json_data = st.session_state.issue_search_results
+        else:
+            json_data = find_github_issues(user_input=prompt,
+                state=state_filter,
+                assigned=assignment_filter,
+                sort_by=sort_by,
+                sort_order=order or "desc",
+                recent_days=recent_days
+            )
+            if isinstance(json_data, list):
+                # 🎯 Best match ranks by fit with the user's languages; other options keep GitHub's sort
+                if sort_by is None:
+                    json_data = rerank(json_data, st.session_state.get("language_distribution"))
+                st.session_state.issue_search_key = search_key
+                st.session_state.issue_search_results = json_data
+        if isinstance(json_data, dict):
+            # e.g. the search rate limit, with the time it resets
+            st.error(json_data["error"])
+        else:
+            total_issues = len(json_data)
 
-        st.markdown(f"### Showing {total_issues} issues")
-        display_issues(json_data)
+            st.markdown(f"### Showing {total_issues} issues")
+            display_issues(json_data, presummarize=presummarize, page_size=page_size)
 
 # Profile Visualization Page
 # Profile Visualization Page
 elif st.session_state.page == "Profile Visualization":
-    import requests
     import pandas as pd
-    import matplotlib.pyplot as plt
-    import plotly.express as px
-    from datetime import datetime
-    from collections import Counter
+    from datetime import datetime, timedelta
 
     st.title(":material/bar_chart: Visualize Your GitHub Profile")
 
@@ -556,16 +650,18 @@ elif st.session_state.page == "Profile Visualization":
 
     # Use stored PAT
     if "pat" in st.session_state and st.session_state.pat:
-        pat = st.session_state.pat
-        headers = {"Authorization": f"token {pat}"}
+        client = get_client()
     else:
         st.error("GitHub PAT not found. Please login again.")
         st.stop()
 
+    # Only commits inside this window are fetched and plotted
+    commit_window_days = 30
+    commit_bucket = st.selectbox("Group commits by", list(BUCKETS))
+
     if st.button("Fetch Data"):
     # Fetch GitHub Data
-        url = f"https://api.github.com/user"
-        response = requests.get(url, headers=headers)
+        response = client.get("/user")
 
         if response.status_code == 200:
             user_data = response.json()
@@ -573,25 +669,16 @@ elif st.session_state.page == "Profile Visualization":
             if username:
                 st.success(f"Logged in as: {username}")
 
-                # Get user repositories
-                repo_response = requests.get(f"https://api.github.com/users/{username}/repos", headers=headers)
-                if repo_response.status_code == 200:
-                    repos = repo_response.json()
+                # Get repositories with languages and commits, re-querying only repos pushed since the last visit
+                since = datetime.utcnow() - timedelta(days=commit_window_days)
+                repos = refresh_profile_repos(username, client=client, since=since)
+                if "error" not in repos:
 
                     # Extract Data
                     repo_names = [repo["name"] for repo in repos]
-                    stars = [repo["stargazers_count"] for repo in repos]
-                    forks = [repo["forks_count"] for repo in repos]
-                    languages = []
-                    for repo in repos:
-                        repo_name = repo["name"]
-                        lang_url = f"https://api.github.com/repos/{username}/{repo_name}/languages"
-                        lang_response = requests.get(lang_url, headers=headers)
-                        if lang_response.status_code == 200:
-                            lang_data = lang_response.json()
-                            languages.append(', '.join(lang_data.keys()))
-                        else:
-                            languages.append('')
+                    stars = [repo["stars"] for repo in repos]
+                    forks = [repo["forks"] for repo in repos]
+                    languages = [', '.join(repo["languages"].keys()) for repo in repos]
 
                     # Convert to DataFrame
                     df = pd.DataFrame({"Repository": repo_names, "Languages": languages, "Stars": stars, "Forks": forks})
@@ -599,73 +686,21 @@ elif st.session_state.page == "Profile Visualization":
                     # 📊 Pretty Bar Chart for Stars
                     st.subheader("Stars per Repository")
                     if not df.empty:
-                        bar_fig = px.bar(
-                            df.sort_values("Stars", ascending=False),
-                            x="Stars",
-                            y="Repository",
-                            orientation="h",
-                            color="Stars",
-                            color_continuous_scale="Sunsetdark",
-                            title="Repository Stars Overview",
-                            labels={"Stars": "Star Count", "Repository": "Repository Name"},
-                        )
-                        bar_fig.update_layout(
-                            xaxis=dict(
-                                range=[0, 20],
-                                tickmode='linear',
-                                tick0=0,
-                                dtick=1  # Ensures integer steps
-                            ),
-                            plot_bgcolor="rgba(0,0,0,0)",
-                            paper_bgcolor="rgba(0,0,0,0)",
-                            font=dict(size=14),
-                            title_x=0.5,
-                        )
+                        bar_fig = stars_bar_figure(df)
                         st.plotly_chart(bar_fig)
                     else:
                         st.info("No repository data found.")
 
                     # 📈 Commit History Line Graph
-                    st.subheader("📅 Commit History (Last 30 Days)")
-                    commit_dates = []
-
-                    for repo in repos:  # Limit to first 3 repos to reduce API load
-                        repo_name = repo["name"]
-                        commits_url = f"https://api.github.com/repos/{username}/{repo_name}/commits"
-                        params = {"per_page": 100}
-                        commits_resp = requests.get(commits_url, headers=headers, params=params)
-
-                        if commits_resp.status_code == 200:
-                            commits = commits_resp.json()
-                            for commit in commits:
-                                try:
-                                    date_str = commit["commit"]["committer"]["date"]
-                                    date_obj = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ").date()
-                                    commit_dates.append(date_obj)
-                                except Exception:
-                                    continue
-
-                    if commit_dates:
-                        commit_df = pd.DataFrame(commit_dates, columns=["date"])
-                        commit_df = commit_df.groupby("date").size().reset_index(name="commits")
-
-                        line_fig = px.line(
-                            commit_df,
-                            x="date",
-                            y="commits",
-                            title="Your GitHub Commit History",
-                            markers=True,
-                            line_shape="spline",
-                            labels={"date": "Date", "commits": "Number of Commits"},
-                        )
+                    st.subheader(f"📅 Commit History (Last {commit_window_days} Days)")
+                    commit_df = commit_counts(
+                        (date_str for repo in repos for date_str in repo["commit_dates"]),
+                        freq=BUCKETS[commit_bucket],
+                        since=since,
+                    )
 
-                        line_fig.update_layout(
-                            plot_bgcolor="rgba(0,0,0,0)",
-                            paper_bgcolor="rgba(0,0,0,0)",
-                            font=dict(size=14),
-                            title_x=0.5,
-                            hovermode="x unified",
-                        )
+                    if not commit_df.empty:
+                        line_fig = commit_line_figure(commit_df)
 
                         st.plotly_chart(line_fig)
                     else:
@@ -675,8 +710,58 @@ elif st.session_state.page == "Profile Visualization":
                     st.subheader("📋 Repository Data")
                     st.dataframe(df)
                 else:
-                    st.error("Failed to fetch repositories.")
+                    st.error(f"Failed to fetch repositories. {repos['error']}")
             else:
                 st.error("Username not found.")
         else:
             st.error("Failed to fetch data. Check the token and try again.")
+
+# Metrics Page (admin only)
+elif st.session_state.page == "Metrics" and ADMIN_PAGE:
+    st.title(":material/monitoring: Metrics")
+    st.caption("Since this server process started. Latency percentiles are estimated from histogram buckets.")
+
+    def latency_rows(name, label):
+        return [{
+            label: " / ".join(labels.values()),
+            "calls": summary["count"],
+            "mean ms": round(summary["mean"] * 1000, 1),
+            "p50 ms": round(summary["p50"] * 1000, 1),
+            "p95 ms": round(summary["p95"] * 1000, 1),
+        } for labels, summary in sorted(metrics.histograms(name), key=lambda item: sorted(item[0].items()))]
+
+    # 🐙 GitHub API
+    st.subheader("GitHub API")
+    st.dataframe(latency_rows("github_request_duration_seconds", "endpoint"), use_container_width=True)
+    statuses = {}
+    for labels, count in metrics.counters("github_requests_total"):
+        statuses.setdefault(labels["endpoint"], {})[labels["status"]] = count
+    received = {labels["endpoint"]: value for labels, value in metrics.counters("github_response_bytes_total")}
+    st.dataframe([{"endpoint": endpoint, **codes, "KB received": round(received.get(endpoint, 0) / 1024, 1)}
+                  for endpoint, codes in sorted(statuses.items())], use_container_width=True)
+    st.write("Rate limit left (lowest across tokens): " + (", ".join(
+        f"{labels['resource']} {value}" for labels, value in metrics.gauges("github_rate_limit_remaining")
+    ) or "unknown yet"))
+
+    # ⏱️ Functions and Gemini
+    st.subheader("Functions")
+    st.dataframe(latency_rows("function_duration_seconds", "function"), use_container_width=True)
+    st.subheader("Gemini")
+    st.dataframe(latency_rows("gemini_request_duration_seconds", "call / outcome"), use_container_width=True)
+    circuit_open = any(value for _, value in metrics.gauges("gemini_circuit_open"))
+    st.write("Circuit breaker: " + ("🔴 open" if circuit_open else "🟢 closed"))
+
+    # 🗄️ Caches
+    st.subheader("Cache hit ratios")
+    lookups = {}
+    for labels, count in metrics.counters("cache_lookups_total"):
+        lookups.setdefault(labels["cache"], {})[labels["result"]] = count
+    st.dataframe([{
+        "cache": cache,
+        **results,
+        "hit ratio": f"{1 - results.get('misses', 0) / sum(results.values()):.0%}",
+    } for cache, results in sorted(lookups.items())], use_container_width=True)
+    st.caption(f"GitHub requests that spent no rate limit: {get_http_cache_stats()['rate_limit_saved']}")
+
+    st.download_button("⬇️ Download Prometheus metrics", metrics.to_prometheus(),
+                       file_name="commit_connect.prom", mime="text/plain")
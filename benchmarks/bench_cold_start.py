@@ -0,0 +1,87 @@
+"""
+Cold-start budget check. Exits non-zero if startup regresses.
+
+Run from the repository root:
+    python -m benchmarks.bench_cold_start
+
+Two checks:
+  1. app.py must not import heavy libraries at module level; each page imports its own.
+  2. Importing streamlit, gemini and the utils modules in a fresh interpreter must stay under
+     COLD_START_BUDGET seconds (median of ROUNDS runs), and gemini/utils must not pull in a
+     heavy library that streamlit itself didn't already load.
+"""
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "matplotlib", "plotly", "google.generativeai", "numpy")
+# Seconds; streamlit itself accounts for most of this. Override with COLD_START_BUDGET.
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET", "2.0"))
+ROUNDS = 5
+
+# Heavy modules streamlit loads on its own are not our regression, so only new ones are reported.
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+baseline = set(sys.modules)
+import gemini, utils.github_api, utils.github_graphql, utils.charts, utils.rerank
+elapsed = time.perf_counter() - start
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules and name not in baseline]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def top_level_heavy_imports(path):
+    """Heavy modules imported in the module body of `path`, outside any page branch or function."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        else:
+            continue
+        found += [name for name in names if name == "gemini" or name.startswith(HEAVY_MODULES)]
+    return found
+
+
+def measure_import():
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    failures = []
+
+    eager = top_level_heavy_imports(os.path.join(REPO_ROOT, "app.py"))
+    if eager:
+        failures.append(f"app.py imports {', '.join(eager)} at module level")
+
+    runs = [measure_import() for _ in range(ROUNDS)]
+    median = statistics.median(run["seconds"] for run in runs)
+    print(f"import streamlit + gemini + utils: median {median * 1000:.0f} ms over {ROUNDS} runs "
+          f"(budget {COLD_START_BUDGET * 1000:.0f} ms)")
+    if median > COLD_START_BUDGET:
+        failures.append(f"cold start {median:.2f}s is over the {COLD_START_BUDGET:.2f}s budget")
+    heavy = sorted({name for run in runs for name in run["heavy"]})
+    if heavy:
+        failures.append(f"importing gemini/utils pulls in {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Token savings / latency benchmark for issue-body compaction.
+
+Run from the repository root:
+    python -m benchmarks.bench_issue_compaction           # tokens and compaction time only
+    python -m benchmarks.bench_issue_compaction --live    # also time one Gemini summary per body,
+                                                          # raw vs compacted (needs GEMINI_KEY in secrets)
+
+The corpus holds issue bodies shaped like common GitHub issue templates: tracebacks, log dumps,
+template comments, screenshots, large code and config blocks, and short plain issues as controls.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+
+from utils.issue_compaction import compact_issue_body, estimate_tokens
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "issue_corpus.json")
+ROUNDS = 50
+
+
+def time_summary(prompt):
+    from gemini import generate
+
+    start = time.perf_counter()
+    generate(prompt)
+    return time.perf_counter() - start
+
+
+def main():
+    live = "--live" in sys.argv
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    if live:
+        from gemini import _summary_prompt
+
+    rows = []
+    for case in corpus:
+        body = case["body"]
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            compacted = compact_issue_body(body)
+        compact_us = (time.perf_counter() - start) / ROUNDS * 1e6
+        row = {
+            "name": case["name"],
+            "raw": estimate_tokens(body),
+            "compacted": estimate_tokens(compacted),
+            "compact_us": compact_us,
+        }
+        if live:
+            row["raw_s"] = time_summary(_summary_prompt(body, compact=False))
+            row["compacted_s"] = time_summary(_summary_prompt(body))
+        rows.append(row)
+
+    header = f"{'issue':38} {'raw tok':>8} {'compact':>8} {'saved':>6} {'µs':>7}"
+    if live:
+        header += f" {'raw s':>7} {'comp s':>7}"
+    print(header)
+    for row in rows:
+        line = (f"{row['name']:38} {row['raw']:8d} {row['compacted']:8d} "
+                f"{1 - row['compacted'] / row['raw']:6.0%} {row['compact_us']:7.0f}")
+        if live:
+            line += f" {row['raw_s']:7.2f} {row['compacted_s']:7.2f}"
+        print(line)
+
+    raw_total = sum(row["raw"] for row in rows)
+    compacted_total = sum(row["compacted"] for row in rows)
+    print(f"\ntotal input tokens: {raw_total} -> {compacted_total} "
+          f"({1 - compacted_total / raw_total:.0%} saved), "
+          f"median compaction {statistics.median(row['compact_us'] for row in rows):.0f} µs per body")
+    if live:
+        print(f"median summary latency: raw {statistics.median(row['raw_s'] for row in rows):.2f} s, "
+              f"compacted {statistics.median(row['compacted_s'] for row in rows):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
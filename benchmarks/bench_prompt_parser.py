@@ -0,0 +1,62 @@
+"""
+Latency / accuracy benchmark for the local prompt parser.
+
+Run from the repository root:
+    python -m benchmarks.bench_prompt_parser
+
+Coverage is the share of prompts parsed locally (confidence >= MIN_CONFIDENCE).
+Accuracy is measured on those prompts only, since the rest are sent to Gemini.
+"""
+import json
+import os
+import statistics
+import time
+
+from utils.prompt_parser import parse_prompt_locally, MIN_CONFIDENCE
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "prompt_corpus.json")
+FIELDS = ("languages", "frameworks and libraries", "tools", "difficulty", "other_filters")
+ROUNDS = 200
+
+
+def _same(expected, actual):
+    if isinstance(expected, list):
+        return sorted(expected) == sorted(actual)
+    return expected == actual
+
+
+def main():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    timings = []
+    local, exact, field_hits = 0, 0, 0
+    for case in corpus:
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            parsed, confidence = parse_prompt_locally(case["prompt"])
+        timings.append((time.perf_counter() - start) / ROUNDS * 1e6)
+
+        if confidence < MIN_CONFIDENCE:
+            print(f"  -> Gemini  ({confidence:.2f})  {case['prompt'][:70]}")
+            continue
+        local += 1
+        matches = [_same(case[field], parsed[field]) for field in FIELDS]
+        field_hits += sum(matches)
+        exact += all(matches)
+        if not all(matches):
+            wrong = [field for field, ok in zip(FIELDS, matches) if not ok]
+            print(f"  mismatch ({', '.join(wrong)})  {case['prompt'][:70]}")
+
+    print(f"prompts:          {len(corpus)}")
+    print(f"parsed locally:   {local} ({local / len(corpus):.0%})")
+    if local:
+        print(f"exact match:      {exact / local:.0%}")
+        print(f"field accuracy:   {field_hits / (local * len(FIELDS)):.0%}")
+    print(f"latency median:   {statistics.median(timings):.1f} µs")
+    print(f"latency max:      {max(timings):.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
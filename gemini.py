@@ -1,27 +1,208 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv, find_dotenv
 import json
 import re
+import hashlib
+import random
+import threading
+import time
 import requests
 import urllib
 import urllib.parse
 import streamlit as st
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-
-genai_api_key= st.secrets["GEMINI_KEY"]
-#load_dotenv(find_dotenv())
-#genai_api_key = os.getenv("gemini_api")
-genai.configure(api_key=genai_api_key)
-
+from utils.cache import TTLCache, cache_path
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import metrics, timed
+from utils.github_api import get_app_client, SEARCH_MAX_WORKERS
+from utils.rate_limit import rate_limit_message
+from utils.search_index import search_index
+from utils.query_planner import matches, sort_items
+from utils.vector_index import get_issue_vectors
+from utils.prompt_parser import parse_prompt_locally, MIN_CONFIDENCE
+from utils.issue_compaction import compact_issue_body, estimate_tokens
+
+GEMINI_MODEL = "gemini-2.0-flash"
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the shared Gemini model handle, importing and configuring google.generativeai
+    on first use so pages that never call Gemini don't pay for it at startup.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+
+                genai_api_key= st.secrets["GEMINI_KEY"]
+                #load_dotenv(find_dotenv())
+                #genai_api_key = os.getenv("gemini_api")
+                genai.configure(api_key=genai_api_key)
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+# Every Gemini request goes through generate / generate_stream:
+#   GEMINI_TIMEOUT             seconds one attempt may take (batched summaries get GEMINI_BATCH_TIMEOUT)
+#   GEMINI_MAX_RETRIES         extra attempts after a transient error, with full-jitter backoff
+#   GEMINI_MAX_CONCURRENCY     requests in flight across all sessions; others wait GEMINI_QUEUE_TIMEOUT.
+#                              Background pre-summarization may use at most half of them.
+# The breaker stops calling Gemini for a while once half of the recent attempts failed.
+GEMINI_TIMEOUT = 30
+GEMINI_BATCH_TIMEOUT = 90
+GEMINI_MAX_RETRIES = 2
+GEMINI_BACKOFF = 1.0
+GEMINI_MAX_CONCURRENCY = 4
+GEMINI_QUEUE_TIMEOUT = 5
+_gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+_gemini_breaker = CircuitBreaker(window=20, min_calls=5, error_rate=0.5, cooldown=30)
+metrics.gauge("gemini_circuit_open", lambda: [({}, int(_gemini_breaker.state == "open"))])
+
+class GeminiUnavailable(Exception):
+    """Gemini is failing, overloaded or too slow; callers should degrade instead of waiting."""
+
+def generate(prompt, timeout=GEMINI_TIMEOUT):
+    """generate_content with a deadline, retries, the concurrency cap and the circuit breaker."""
+    metrics.inc("gemini_request_bytes_total", len(prompt.encode("utf-8")), call="generate")
+    with _gemini_slot():
+        return _with_retries(lambda: get_model().generate_content(prompt, request_options={"timeout": timeout}),
+                             "generate")
+
+def generate_stream(prompt, timeout=GEMINI_TIMEOUT):
+    """
+    Streaming generate_content under the same policy. Only the wait for the first chunk
+    is retried; an error after that ends the stream.
+    """
+    metrics.inc("gemini_request_bytes_total", len(prompt.encode("utf-8")), call="stream")
+    with _gemini_slot():
+        def first_chunk():
+            chunks = iter(get_model().generate_content(prompt, stream=True, request_options={"timeout": timeout}))
+            return next(chunks, None), chunks
+
+        first, chunks = _with_retries(first_chunk, "stream")
+        if first is None:
+            return
+        yield first
+        try:
+            yield from chunks
+        except Exception as e:
+            if _is_transient(e):
+                _gemini_breaker.record(False)
+                raise GeminiUnavailable(f"Gemini stream failed: {e}") from e
+            raise
+
+@contextmanager
+def _gemini_slot():
+    """Hold one of the GEMINI_MAX_CONCURRENCY request slots, refusing fast while the breaker is open."""
+    if not _gemini_slots.acquire(timeout=GEMINI_QUEUE_TIMEOUT):
+        raise GeminiUnavailable("Too many Gemini requests in flight; please try again in a moment.")
+    try:
+        if not _gemini_breaker.allow():
+            raise GeminiUnavailable("Gemini is failing right now; please try again in a minute.")
+        yield
+    finally:
+        _gemini_slots.release()
+
+def _with_retries(call, kind):
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            transient = _is_transient(e)
+            metrics.observe("gemini_request_duration_seconds", time.perf_counter() - start,
+                            call=kind, outcome="transient_error" if transient else "error")
+            if not transient:
+                # Bad requests or blocked prompts say nothing about the endpoint's health
+                _gemini_breaker.record(True)
+                raise
+            _gemini_breaker.record(False)
+            if attempt == GEMINI_MAX_RETRIES or not _gemini_breaker.allow():
+                raise GeminiUnavailable(f"Gemini request failed: {e}") from e
+            time.sleep(random.uniform(0, GEMINI_BACKOFF * 2 ** attempt))
+        else:
+            metrics.observe("gemini_request_duration_seconds", time.perf_counter() - start, call=kind, outcome="ok")
+            _gemini_breaker.record(True)
+            return result
+
+def _is_transient(error):
+    """Timeouts, throttling and 5xx errors, which are worth retrying and count against the breaker."""
+    from google.api_core import exceptions
+
+    transient = (exceptions.TooManyRequests, exceptions.ResourceExhausted, exceptions.InternalServerError,
+                 exceptions.ServiceUnavailable, exceptions.GatewayTimeout, exceptions.DeadlineExceeded)
+    return isinstance(error, transient + (TimeoutError, ConnectionError, requests.RequestException))
+
+# Parsed prompts, shared by every session. Errors are never cached.
+PARSE_CACHE_SIZE = 512
+PARSE_CACHE_TTL = 7 * 24 * 3600
+_parse_cache = TTLCache(maxsize=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL,
+                        db_path=cache_path("prompt_cache.sqlite3"), table="parsed_prompts")
+
+# Issue summaries, content-addressed on issue id + body hash and shared across sessions.
+SUMMARY_DISK_MAX_ENTRIES = 5000
+_summary_cache = TTLCache(maxsize=256, ttl=None, db_path=cache_path("summary_cache.sqlite3"),
+                          table="issue_summaries", disk_maxsize=SUMMARY_DISK_MAX_ENTRIES)
+# Input tokens of issue bodies packed into one summarize_issues request
+BATCH_TOKEN_BUDGET = 24000
+
+# GitHub's default page size for issue search (build_issue_query doesn't set per_page)
+ISSUE_PAGE_SIZE = 30
+# Issue search is split into at most this many sub-queries; relaxed ones only run if the
+# stricter ones found fewer than ENOUGH_ISSUES. RRF_K damps the rank in the merged score.
+MAX_SUB_QUERIES = 6
+ENOUGH_ISSUES = ISSUE_PAGE_SIZE
+RRF_K = 60
+# Local recall: issues fetched earlier whose title/body resemble the prompt join the results
+# when their cosine similarity is at least LOCAL_RECALL_MIN_SCORE
+LOCAL_RECALL_K = 20
+LOCAL_RECALL_MIN_SCORE = 0.2
+LOCAL_RECALL_WEIGHT = 0.5
+
+# Background summarization of the issues at the top of a result list. Each worker makes one
+# Gemini request at a time, so the pool never holds more than half of the GEMINI_MAX_CONCURRENCY
+# slots and interactive calls (prompt parsing, "Learn more") always find one free.
+PRESUMMARIZE_WORKERS = GEMINI_MAX_CONCURRENCY // 2
+_presummarize_pool = ThreadPoolExecutor(max_workers=PRESUMMARIZE_WORKERS, thread_name_prefix="presummarize")
+_pending_summaries = {}
+_pending_lock = threading.Lock()
+
+def normalize_prompt(text):
+    """Collapse whitespace and case so trivially different prompts share a cache entry."""
+    return " ".join(text.split()).lower()
+
+@timed("parse_user_prompt")
 def parse_user_prompt(text):
     """
-    Parses user input using Gemini to extract languages, difficulty, and other filters.
+    Parses user input to extract languages, difficulty, and other filters.
+    Prompts the local lexicons understand are parsed without an LLM; the rest go to Gemini,
+    falling back to the partial local parse if Gemini fails.
+    Results are cached on the normalized prompt, so repeated calls cost one Gemini request.
     Returns a dictionary or error message.
     """
+    key = normalize_prompt(text)
+    parsed = _parse_cache.get(key)
+    if parsed is not None:
+        return parsed
+
+    parsed, confidence = parse_prompt_locally(text)
+    if confidence < MIN_CONFIDENCE:
+        local_parsed = parsed
+        parsed = _gemini_parse_prompt(text)
+        if "error" in parsed and confidence > 0:
+            # Gemini is down: a partial local parse beats an error. Not cached, so Gemini gets another go.
+            return local_parsed
+    if "error" not in parsed:
+        _parse_cache.set(key, parsed)
+    return parsed
+
+def _gemini_parse_prompt(text):
+    """Sends the prompt to Gemini and extracts the JSON filters from its reply."""
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-
         prompt = f"""
 You are an advanced AI assistant designed to support an open-source contribution platform by parsing user-submitted prompts and extracting structured filters to refine project recommendations. Users may describe what they are looking for in a project—including preferred or excluded technologies, tools, and project difficulty levels—either explicitly or implicitly. Your role is to accurately infer and extract relevant information, even when it's not directly stated.
 
@@ -94,7 +275,7 @@ Return ONLY a JSON object with the fields:
 No markdown or explanation. Only the JSON.
 """
 
-        response = model.generate_content(prompt)
+        response = generate(prompt)
         result = response.text.strip()
 
         # Extract the JSON block from the response using regex
@@ -197,44 +378,135 @@ def build_issue_query(languages, frameworks, tools, difficulty, filters,state="o
 
     return query, url 
 
-@st.cache_data
-def fetch_issues_from_github(query_url):
-    headers = {
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.get(query_url, headers=headers)
+@timed("fetch_issues_from_github")
+def fetch_issues_from_github(query_url, client=None):
+    """
+    Fetch one page of issue search results. Not memoized: the search index decides when a search
+    is still fresh, and the HTTP cache revalidates repeats with ETags.
+    """
+    client = client or get_app_client()
+    try:
+        response = client.get(query_url)
+    except requests.RequestException as e:
+        return {"error": f"GitHub API request failed: {e}"}
 
     if response.status_code == 200:
-        data = response.json()
-        return data.get("items", [])
+        items = response.json().get("items", [])
+        get_issue_vectors().add(items)
+        return items
     else:
-        return {"error": f"GitHub API error {response.status_code}: {response.text}"}
+        return {"error": rate_limit_message(response) or f"GitHub API error {response.status_code}: {response.text}"}
 
+def plan_issue_queries(languages, frameworks, tools, difficulty, filters, max_queries=MAX_SUB_QUERIES, **options):
+    """
+    Split a parsed prompt into tiers of sub-queries, strictest first.
+    One combined query ANDs every language (an issue's repo has only one), so each language
+    gets its own query instead. Tier 1 keeps the topic labels; tier 2 drops them and keeps
+    only the difficulty label. Tier 2 is skipped when it would have neither a language nor a
+    difficulty label left, since it would then match arbitrary issues from all of GitHub.
+    Each sub-query is a (query, url, weight) tuple; `options` are passed to build_issue_query.
+    """
+    per_language = [[lang] for lang in languages or []] or [None]
+    has_topics = bool(frameworks or tools or filters)
+    has_difficulty_label = (difficulty or "").lower() in ("beginner", "intermediate")
+    tiers = [[(langs, frameworks, tools, filters, 1.0) for langs in per_language]]
+    if has_topics and (languages or has_difficulty_label):
+        tiers.append([(langs, None, None, None, 0.5) for langs in per_language])
+
+    planned, budget = [], max_queries
+    for tier in tiers:
+        queries = []
+        for langs, fws, tls, flts, weight in tier[:budget]:
+            query, url = build_issue_query(langs, fws, tls, difficulty, flts, **options)
+            queries.append((query, url, weight))
+        budget -= len(queries)
+        if queries:
+            planned.append(queries)
+    return planned
+
+@timed("find_github_issues")
 def find_github_issues(user_input,state="open", assigned="all",sort_by=None, sort_order='desc', recent_days=90):
+    """
+    Search issues for a prompt: the prompt's sub-queries (see plan_issue_queries) run concurrently,
+    tier by tier, until ENOUGH_ISSUES distinct issues are found, and similar issues from the local
+    vector index that they didn't return are added. Results are merged by issue id
+    and ranked by a combined reciprocal-rank score, stored on each issue as "relevance".
+    If every sub-query fails, issues indexed earlier whose text matches the prompt are returned
+    instead; a dict with an "error" key only comes back when there are none.
+    """
     # Parse the prompt
     languages, frameworks, tools, difficulty, filters = get_filters(user_input)
 
-    # Build query
-    query, query_url = build_issue_query(languages, frameworks, tools, difficulty, filters,state=state,
+    tiers = plan_issue_queries(languages, frameworks, tools, difficulty, filters,
+        state=state,
         assigned=assigned,
         recent_days=recent_days,
-        sort_by=sort_by, 
+        sort_by=sort_by,
         sort_order=sort_order)
 
-    # Fetch results
-    results = fetch_issues_from_github(query_url)
-
+    # Session state isn't reachable from worker threads, so resolve the client here
+    client = get_app_client()
+    # Recalled before the sub-queries run, so this search's own results don't feed back into it
+    recalled = _recall_local_issues(user_input, tiers[0][0][0], state)
+    merged, error = {}, None
+
+    # The strictest tier always runs, so new issues keep flowing into the local index
+    for tier in tiers:
+        def search(sub_query):
+            query, query_url, _ = sub_query
+            return _run_issue_query(query, query_url, sort_by, sort_order, client)
+
+        workers = min(SEARCH_MAX_WORKERS, len(tier))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            tier_results = list(pool.map(search, tier))
+
+        for (_, _, weight), results in zip(tier, tier_results):
+            if not isinstance(results, list):
+                error = error or results
+                continue
+            for rank, issue in enumerate(results):
+                entry = merged.setdefault(issue["id"], {**issue, "relevance": 0.0})
+                entry["relevance"] += weight / (RRF_K + rank)
+
+        if len(merged) >= ENOUGH_ISSUES:
+            break
+
+    # Only issues the sub-queries didn't return are added, at a lower weight, so repeating a
+    # search returns the same order however much the index has learned from it
+    for rank, issue in enumerate(issue for issue in recalled if issue["id"] not in merged):
+        merged[issue["id"]] = {**issue, "relevance": LOCAL_RECALL_WEIGHT / (RRF_K + rank)}
+
+    if not merged and error is not None:
+        # GitHub can't be searched right now (e.g. rate limited): fall back to issues fetched earlier
+        fallback = _search_local_issues(user_input, tiers[0][0][0], state)
+        return sort_items(fallback, sort_by, sort_order) if fallback else error
+    issues = sorted(merged.values(), key=lambda issue: issue["relevance"], reverse=True)
+    return sort_items(issues, sort_by, sort_order)
+
+def _recall_local_issues(user_input, query, state):
+    """Indexed issues most similar to the prompt that also satisfy `query`'s state, date and assignee filters."""
+    hits = get_issue_vectors().search(user_input, k=LOCAL_RECALL_K)
+    ids = [issue_id for issue_id, score in hits if score >= LOCAL_RECALL_MIN_SCORE]
+    return [issue for issue in search_index.get_items("issues", ids)
+            if issue.get("state") == state and matches(query, issue)]
+
+def _search_local_issues(user_input, query, state):
+    """Indexed issues whose text matches the prompt's words, filtered like `query`, best matches first."""
+    return [issue for issue in search_index.search_text("issues", user_input, limit=ENOUGH_ISSUES, state=state)
+            if matches(query, issue)]
+
+def _run_issue_query(query, query_url, sort_by, sort_order, client):
+    """Run one issue search, serving a recent identical or broader search from the local index."""
+    results = search_index.plan("issues", query, sort_by, sort_order)
+    if results is None:
+        results = fetch_issues_from_github(query_url, client=client)
+        if isinstance(results, list):
+            search_index.ingest("issues", query, results, page_size=ISSUE_PAGE_SIZE,
+                                sort_by=sort_by, order=sort_order)
     return results
 
-def summarize_issue(issue_body: str) -> str:
-    # Initialize Gemini
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    
-    # Prompt template
-    prompt = f"""
-You are an expert assistant helping beginners understand GitHub issues. Given the following GitHub issue description written in markdown, generate a beginner-friendly **markdown-formatted summary**.
-
-The summary should include:
+# Sections every issue summary contains, shared by the single and batched prompts
+SUMMARY_SECTIONS = """The summary should include:
 
 ## 📝 What the Issue is About
 - Explain clearly what the issue is addressing or asking for.
@@ -248,13 +520,183 @@ The summary should include:
 
 ## 📘 Glossary of Terms
 - Identify and explain any technical terms or acronyms found in the issue to help beginners.
+"""
+
+def summary_cache_key(issue_body: str, issue_id=None) -> str:
+    """Key a summary on the issue it belongs to and the exact body it was generated from."""
+    body_hash = hashlib.sha256(issue_body.encode("utf-8")).hexdigest()
+    return f"{issue_id}:{body_hash}"
 
+@timed("summarize_issue")
+def summarize_issue(issue_body: str, issue_id=None) -> str:
+    """
+    Returns a beginner-friendly markdown summary of an issue body.
+    Summaries are reused across sessions until the issue body changes.
+    """
+    key = summary_cache_key(issue_body, issue_id)
+    summary = _summary_cache.get(key)
+    if summary is not None:
+        return summary
+
+    # Run the model
+    response = generate(_summary_prompt(issue_body))
+    summary = response.text
+    if summary.strip():
+        _summary_cache.set(key, summary)
+    return summary
+
+def stream_issue_summary(issue_body: str, issue_id=None):
+    """
+    Same summary as summarize_issue, yielded in chunks as Gemini writes it.
+    A cached summary is yielded whole. The completed text is cached once the stream ends;
+    a stream that fails part-way, or yields no text (e.g. a safety block), caches nothing.
+    """
+    key = summary_cache_key(issue_body, issue_id)
+    summary = _summary_cache.get(key)
+    if summary is not None:
+        yield summary
+        return
+
+    chunks = []
+    for chunk in generate_stream(_summary_prompt(issue_body)):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. only safety ratings) have nothing to show
+            continue
+        chunks.append(text)
+        yield text
+    summary = "".join(chunks)
+    if summary.strip():
+        _summary_cache.set(key, summary)
+
+def _summary_prompt(issue_body, compact=True):
+    if compact:
+        issue_body = compact_issue_body(issue_body)
+    return f"""
+You are an expert assistant helping beginners understand GitHub issues. Given the following GitHub issue description written in markdown, generate a beginner-friendly **markdown-formatted summary**.
+
+{SUMMARY_SECTIONS}
 Here is the issue body:
 \"\"\"
 {issue_body}
 \"\"\"
 """
 
-    # Run the model
-    response = model.generate_content(prompt)
-    return response.text
\ No newline at end of file
+@timed("summarize_issues")
+def summarize_issues(issues, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Summarizes many GitHub issue dicts in as few Gemini requests as possible.
+    Cached summaries are reused; the rest are packed into batches of up to `token_budget`
+    input tokens. Issues missing from a batch reply fall back to summarize_issue.
+    Returns {issue id: summary}.
+    """
+    summaries = {}
+    todo = []
+    for issue in issues:
+        if not issue.get("body"):
+            continue
+        summary = _summary_cache.get(summary_cache_key(issue["body"], issue["id"]))
+        if summary is not None:
+            summaries[issue["id"]] = summary
+        else:
+            todo.append(issue)
+
+    for batch in _pack_batches(todo, token_budget):
+        results = _summarize_batch(batch) if len(batch) > 1 else {}
+        for issue in batch:
+            summary = results.get(str(issue["id"]))
+            if summary:
+                _summary_cache.set(summary_cache_key(issue["body"], issue["id"]), summary)
+            else:
+                summary = summarize_issue(issue["body"], issue_id=issue["id"])
+            summaries[issue["id"]] = summary
+    return summaries
+
+def _pack_batches(issues, token_budget):
+    """Greedily group issues so each group's bodies fit in the token budget."""
+    batches = []
+    batch, used = [], 0
+    for issue in issues:
+        tokens = estimate_tokens(compact_issue_body(issue["body"]))
+        if batch and used + tokens > token_budget:
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(issue)
+        used += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _summarize_batch(batch):
+    """One Gemini request for several issues. Returns {str(issue id): summary}, empty if the reply can't be parsed."""
+    issue_blocks = "\n".join(
+        f'### Issue id: {issue["id"]}\n\"\"\"\n{compact_issue_body(issue["body"])}\n\"\"\"\n' for issue in batch
+    )
+    prompt = f"""
+You are an expert assistant helping beginners understand GitHub issues. For EACH of the GitHub issue descriptions below, written in markdown, generate a beginner-friendly **markdown-formatted summary**.
+
+{SUMMARY_SECTIONS}
+Return ONLY a JSON object mapping each issue id (as a string) to its markdown summary, e.g. {{"123": "## 📝 What the Issue is About ..."}}.
+No explanation outside the JSON.
+
+Here are the issues:
+{issue_blocks}
+"""
+    try:
+        response = generate(prompt, timeout=GEMINI_BATCH_TIMEOUT)
+        match = re.search(r"\{[\s\S]*\}", response.text)
+        if not match:
+            return {}
+        parsed = json.loads(match.group(0))
+        return {str(issue_id): summary for issue_id, summary in parsed.items() if isinstance(summary, str)}
+    except Exception:
+        return {}
+
+def presummarize_issues(issues, k=5):
+    """
+    Start summarizing the first k issues on a shared background pool, batched through summarize_issues.
+    Returns {issue id: Future}; an issue already being summarized for another session reuses that Future,
+    and an already cached summary comes back as a finished Future without a new request.
+    """
+    futures, todo = {}, []
+    for issue in issues[:k]:
+        if not issue.get("body"):
+            continue
+        key = summary_cache_key(issue["body"], issue["id"])
+        summary = _summary_cache.get(key)
+        if summary is not None:
+            futures[issue["id"]] = _finished(summary)
+            continue
+        with _pending_lock:
+            future = _pending_summaries.get(key)
+            if future is None:
+                future = Future()
+                _pending_summaries[key] = future
+                todo.append((issue, key, future))
+        futures[issue["id"]] = future
+    if todo:
+        _presummarize_pool.submit(_presummarize_batch, todo)
+    return futures
+
+def _presummarize_batch(todo):
+    """Summarize (issue, key, Future) triples in as few requests as possible, then resolve their Futures."""
+    error = None
+    try:
+        summaries = summarize_issues([issue for issue, _, _ in todo])
+    except Exception as e:
+        summaries, error = {}, e
+    for issue, key, future in todo:
+        # Finished summaries are served by the summary cache from here on
+        with _pending_lock:
+            if _pending_summaries.get(key) is future:
+                del _pending_summaries[key]
+        if issue["id"] in summaries:
+            future.set_result(summaries[issue["id"]])
+        else:
+            future.set_exception(error or GeminiUnavailable("The issue could not be summarized."))
+
+def _finished(result):
+    future = Future()
+    future.set_result(result)
+    return future
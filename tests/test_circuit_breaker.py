@@ -0,0 +1,79 @@
+import threading
+import time
+
+from utils.circuit_breaker import CircuitBreaker
+
+
+COOLDOWN = 0.05
+
+
+def tripped():
+    breaker = CircuitBreaker(window=10, min_calls=5, error_rate=0.5, cooldown=COOLDOWN)
+    for _ in range(5):
+        assert breaker.allow()
+        breaker.record(False)
+    return breaker
+
+
+def in_other_thread(call):
+    thread = threading.Thread(target=call)
+    thread.start()
+    thread.join()
+
+
+def test_opens_after_enough_failures_and_refuses_calls():
+    breaker = CircuitBreaker(window=10, min_calls=5, error_rate=0.5, cooldown=COOLDOWN)
+    for _ in range(4):
+        breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_late_outcomes_of_earlier_calls_do_not_close_or_reopen_it():
+    breaker = tripped()
+    # A call admitted before the breaker opened finishes after it
+    in_other_thread(lambda: breaker.record(True))
+    assert breaker.state == "open"
+
+    time.sleep(COOLDOWN)
+    in_other_thread(lambda: breaker.record(False))
+    assert breaker.state == "half-open"
+
+
+def test_half_open_allows_one_trial_and_only_it_decides():
+    breaker = tripped()
+    time.sleep(COOLDOWN)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    in_other_thread(lambda: breaker.record(True))
+    assert breaker.state == "half-open"
+
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_for_another_cooldown():
+    breaker = tripped()
+    time.sleep(COOLDOWN)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_trial_that_never_reports_is_replaced():
+    breaker = tripped()
+    time.sleep(COOLDOWN)
+    allowed = []
+    in_other_thread(lambda: allowed.append(breaker.allow()))
+    assert allowed == [True]
+    assert not breaker.allow()
+
+    time.sleep(COOLDOWN)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
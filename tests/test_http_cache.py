@@ -0,0 +1,62 @@
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.http_cache import ConditionalCache, parse_max_age
+
+
+def response(status_code=200, body='{"login": "someone"}', **headers):
+    res = requests.Response()
+    res.status_code = status_code
+    res.headers = CaseInsensitiveDict(headers)
+    res._content = body.encode("utf-8")
+    res.encoding = "utf-8"
+    return res
+
+
+def test_keys_are_scoped_per_token_and_ignore_param_order():
+    cache = ConditionalCache()
+    url = "https://api.github.com/user/repos"
+    assert cache.key(url, {"a": 1, "b": 2}, "token") == cache.key(url, {"b": 2, "a": 1}, "token")
+    assert cache.key(url, None, "token") != cache.key(url, None, "other token")
+
+
+def test_saves_only_responses_it_can_revalidate():
+    cache = ConditionalCache()
+    cache.save("no validator", response())
+    cache.save("error", response(404, ETag='"abc"'))
+    cache.save("ok", response(ETag='"abc"', **{"X-RateLimit-Remaining": "10"}))
+
+    assert cache.lookup("no validator") is None
+    assert cache.lookup("error") is None
+    entry = cache.lookup("ok")
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"abc"'}
+    # Rate-limit headers are never replayed from the cache
+    assert "X-RateLimit-Remaining" not in entry["headers"]
+
+
+def test_freshness_follows_max_age_and_a_304_restarts_it():
+    cache = ConditionalCache()
+    cache.save("key", response(ETag='"abc"', **{"Cache-Control": "private, max-age=60"}))
+    entry = cache.lookup("key")
+    assert cache.is_fresh(entry)
+
+    stale = dict(entry, fetched=time.time() - 120)
+    assert not cache.is_fresh(stale)
+    assert cache.is_fresh(cache.refresh("key", stale))
+
+
+def test_build_response_replays_the_body():
+    cache = ConditionalCache()
+    cache.save("key", response(ETag='"abc"', **{"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}))
+    replayed = cache.build_response(cache.lookup("key"), "https://api.github.com/user")
+    assert replayed.status_code == 200
+    assert replayed.json() == {"login": "someone"}
+    assert replayed.headers["etag"] == '"abc"'
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=60, s-maxage=60") == 60
+    assert parse_max_age("private, max-age=60, no-cache") == 0
+    assert parse_max_age("") == 0
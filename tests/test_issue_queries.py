@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from gemini import plan_issue_queries
+
+
+def queries(tiers):
+    return [[query for query, _, _ in tier] for tier in tiers]
+
+
+def test_one_query_per_language_then_a_relaxed_tier():
+    tiers = queries(plan_issue_queries(["Python", "Rust"], ["Django"], None, "Beginner", None))
+    assert len(tiers) == 2
+    assert ["language:Python" in query for query in tiers[0]] == [True, False]
+    assert all("label:Django" in query for query in tiers[0])
+    assert not any("label:Django" in query for query in tiers[1])
+    assert all('label:"good first issue"' in query for query in tiers[1])
+
+
+def test_relaxed_tier_needs_a_language_or_difficulty_label():
+    # "React bugs": tier 2 would be bare is:issue is:open, i.e. all of GitHub
+    assert len(plan_issue_queries(None, ["React"], None, None, ["bug"])) == 1
+    assert len(plan_issue_queries(None, ["React"], None, "Advanced", ["bug"])) == 1
+    assert len(plan_issue_queries(None, ["React"], None, "Beginner", ["bug"])) == 2
+    assert len(plan_issue_queries(["JavaScript"], ["React"], None, None, ["bug"])) == 2
+
+
+def test_sub_query_budget():
+    tiers = plan_issue_queries(["Python", "Rust", "Go", "Java"], ["web"], None, None, None, max_queries=6)
+    assert [len(tier) for tier in tiers] == [4, 2]
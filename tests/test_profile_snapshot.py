@@ -0,0 +1,100 @@
+import json
+import re
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.github_graphql import COMMITS_PER_REPO
+from utils.profile_snapshot import ProfileSnapshot, refresh_profile_repos
+
+
+REPO_ALIAS = re.compile(r'r(\d+): repository\(owner: "[^"]*", name: "([^"]+)"\) \{(.*?)\n\}', re.DOTALL)
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeGraphQL:
+    """Answers the index query and aliased detail queries from {repo: (pushed_at, [commit dates, newest first])}."""
+
+    def __init__(self, repos):
+        self.repos = repos
+        self.queries = 0
+
+    def post(self, url, json=None):
+        self.queries += 1
+        query = json["query"]
+        if "pushedAt" in query:
+            nodes = [{"name": name, "stargazerCount": 1, "forkCount": 0, "pushedAt": pushed_at}
+                     for name, (pushed_at, _) in self.repos.items()]
+            return FakeResponse({"data": {"user": {"repositories": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": nodes}}}})
+        data = {}
+        for alias, name, fields in REPO_ALIAS.findall(query):
+            data[f"r{alias}"] = self._details(name, fields)
+        return FakeResponse({"data": data})
+
+    def _details(self, name, fields):
+        since = re.search(r'since: "([^"]+)"', fields)
+        after = re.search(r'after: "(\d+)"', fields)
+        dates = [date for date in self.repos[name][1] if not since or date >= since.group(1)]
+        start = int(after.group(1)) if after else 0
+        page = dates[start:start + COMMITS_PER_REPO]
+        node = {"defaultBranchRef": {"target": {"history": {
+            "pageInfo": {"hasNextPage": start + COMMITS_PER_REPO < len(dates),
+                         "endCursor": str(start + COMMITS_PER_REPO)},
+            "nodes": [{"oid": f"{name}-{date}", "committedDate": date} for date in page],
+        }}}}
+        if "languages" in fields:
+            node["languages"] = {"edges": [{"size": 10, "node": {"name": "Python"}}]}
+        return node
+
+
+def dates(day, count):
+    """`count` distinct commit timestamps on one day, newest first."""
+    return [f"2025-06-{day:02d}T{minute // 60:02d}:{minute % 60:02d}:00Z" for minute in reversed(range(count))]
+
+
+def test_refresh_pages_through_history_and_keeps_every_commit():
+    client = FakeGraphQL({"busy": ("2025-06-10", dates(10, 250) + dates(5, 30))})
+    snapshot = ProfileSnapshot()
+
+    repos = refresh_profile_repos("someone", client=client, since=None, snapshot=snapshot)
+    assert len(repos[0]["commit_dates"]) == 280
+
+    # A later push with more new commits than one page must not leave a gap below the watermark
+    client.repos["busy"] = ("2025-06-20", dates(20, 150) + client.repos["busy"][1])
+    repos = refresh_profile_repos("someone", client=client, since=None, snapshot=snapshot)
+    assert len(repos[0]["commit_dates"]) == 430
+
+
+def test_refresh_prunes_commits_outside_the_window():
+    from datetime import datetime
+
+    client = FakeGraphQL({"repo": ("2025-06-10", dates(10, 3) + dates(1, 3))})
+    snapshot = ProfileSnapshot()
+    refresh_profile_repos("someone", client=client, since=None, snapshot=snapshot)
+
+    repos = refresh_profile_repos("someone", client=client, since=datetime(2025, 6, 5), snapshot=snapshot)
+    assert len(repos[0]["commit_dates"]) == 3
+    assert snapshot.load("someone") == repos
+
+
+def test_unchanged_repos_are_not_queried_again():
+    client = FakeGraphQL({"a": ("2025-06-10", dates(10, 2)), "b": ("2025-06-11", dates(11, 2))})
+    snapshot = ProfileSnapshot()
+    refresh_profile_repos("someone", client=client, snapshot=snapshot)
+    queries = client.queries
+
+    refresh_profile_repos("someone", client=client, snapshot=snapshot)
+    # Only the index query runs
+    assert client.queries == queries + 1
+    assert json.dumps(snapshot.load("someone"))
@@ -0,0 +1,115 @@
+import pytest
+
+from utils.query_planner import covers, matches, sort_items
+from utils.search_index import SearchIndex
+
+
+REPO_QUERY = "language:Python stars:>=100 forks:>=0 pushed:>=2025-01-01"
+ISSUE_QUERY = 'is:issue is:open language:Python label:"good first issue" updated:>=2025-01-01'
+
+
+def repo(id, stars, pushed_at="2025-06-01T00:00:00Z"):
+    return {"id": id, "full_name": f"owner/repo{id}", "stargazers_count": stars, "forks_count": 0,
+            "pushed_at": pushed_at}
+
+
+def issue(id, updated_at="2025-06-01T00:00:00Z", assignees=()):
+    return {"id": id, "title": f"issue {id}", "state": "open", "updated_at": updated_at,
+            "assignees": list(assignees), "labels": []}
+
+
+@pytest.mark.parametrize("new_query", [
+    REPO_QUERY,
+    "language:Python stars:>=500 forks:>=0 pushed:>=2025-01-01",
+    "language:Python stars:>=100 forks:>=10 pushed:>=2025-03-01",
+    "pushed:>=2025-01-01 forks:>=0 stars:>=100 language:Python",
+])
+def test_covers_same_or_narrower_query(new_query):
+    assert covers(REPO_QUERY, new_query)
+
+
+@pytest.mark.parametrize("new_query", [
+    "language:Python stars:>=50 forks:>=0 pushed:>=2025-01-01",
+    "language:Python stars:>=100 forks:>=0 pushed:>=2024-06-01",
+    "language:Rust stars:>=100 forks:>=0 pushed:>=2025-01-01",
+    "language:Python forks:>=0 pushed:>=2025-01-01",
+])
+def test_covers_rejects_broader_or_different_query(new_query):
+    assert not covers(REPO_QUERY, new_query)
+
+
+def test_covers_assignee_filters():
+    assert covers(ISSUE_QUERY, ISSUE_QUERY + " no:assignee")
+    assert covers(ISSUE_QUERY, ISSUE_QUERY + " assignee:*")
+    assert not covers(ISSUE_QUERY + " no:assignee", ISSUE_QUERY)
+    assert not covers(ISSUE_QUERY + " no:assignee", ISSUE_QUERY + " assignee:*")
+
+
+def test_matches_applies_ranges_and_assignee():
+    query = "language:Python stars:>=100 forks:>=0 pushed:>=2025-01-01"
+    assert matches(query, repo(1, 100))
+    assert not matches(query, repo(1, 99))
+    assert not matches(query, repo(1, 500, pushed_at="2024-12-31T23:59:59Z"))
+
+    unassigned = ISSUE_QUERY + " no:assignee"
+    assert matches(unassigned, issue(1))
+    assert not matches(unassigned, issue(1, assignees=[{"login": "someone"}]))
+    assert not matches(ISSUE_QUERY, issue(1, updated_at="2024-12-01T00:00:00Z"))
+
+
+def test_sort_items():
+    items = [repo(1, 10), repo(2, 30), repo(3, 20)]
+    assert [item["id"] for item in sort_items(items, "stars", "desc")] == [2, 3, 1]
+    assert [item["id"] for item in sort_items(items, "stars", "asc")] == [1, 3, 2]
+    assert [item["id"] for item in sort_items(items, None, None)] == [1, 2, 3]
+
+
+def test_plan_misses_unknown_and_stale_searches():
+    assert SearchIndex().plan("repos", REPO_QUERY, "stars", "desc") is None
+
+    index = SearchIndex(freshness={"repos": 0, "issues": 0})
+    index.ingest("repos", REPO_QUERY, [repo(1, 200)], page_size=50, sort_by="stars", order="desc")
+    assert index.plan("repos", REPO_QUERY, "stars", "desc") is None
+
+
+def test_plan_reuses_truncated_page_only_in_its_own_sort_order():
+    index = SearchIndex()
+    top = [repo(i, 1000 - i) for i in range(50)]
+    index.ingest("repos", REPO_QUERY, top, page_size=50, sort_by="stars", order="desc")
+
+    assert [item["id"] for item in index.plan("repos", REPO_QUERY, "stars", "desc")] == list(range(50))
+    # The top 50 reversed are not the 50 fewest-starred repositories
+    assert index.plan("repos", REPO_QUERY, "stars", "asc") is None
+    assert index.plan("repos", REPO_QUERY, None, None) is None
+    # Nor does a truncated page hold every result of a narrower search
+    assert index.plan("repos", "language:Python stars:>=990 forks:>=0 pushed:>=2025-01-01", "stars", "desc") is None
+
+
+def test_plan_re_sorts_and_narrows_complete_result_sets():
+    index = SearchIndex()
+    index.ingest("repos", REPO_QUERY, [repo(1, 300), repo(2, 100), repo(3, 200)], page_size=50,
+                 sort_by="stars", order="desc")
+
+    assert [item["id"] for item in index.plan("repos", REPO_QUERY, "stars", "asc")] == [2, 3, 1]
+    narrower = "language:Python stars:>=150 forks:>=0 pushed:>=2025-01-01"
+    assert [item["id"] for item in index.plan("repos", narrower, "stars", "asc")] == [3, 1]
+    broader = "language:Python stars:>=50 forks:>=0 pushed:>=2025-01-01"
+    assert index.plan("repos", broader, "stars", "desc") is None
+
+
+def test_plan_narrows_issue_searches_by_assignee():
+    index = SearchIndex()
+    issues = [issue(1), issue(2, assignees=[{"login": "someone"}]), issue(3)]
+    index.ingest("issues", ISSUE_QUERY, issues, page_size=30)
+
+    assert [item["id"] for item in index.plan("issues", ISSUE_QUERY + " no:assignee")] == [1, 3]
+    assert [item["id"] for item in index.plan("issues", ISSUE_QUERY + " assignee:*")] == [2]
+
+
+def test_plan_serves_another_sort_of_a_complete_issue_search():
+    index = SearchIndex()
+    issues = [issue(1, "2025-06-02T00:00:00Z"), issue(2, "2025-06-03T00:00:00Z"), issue(3, "2025-06-01T00:00:00Z")]
+    index.ingest("issues", ISSUE_QUERY, issues, page_size=30)
+
+    assert [item["id"] for item in index.plan("issues", ISSUE_QUERY, "updated", "desc")] == [2, 1, 3]
+    assert [item["id"] for item in index.plan("issues", ISSUE_QUERY, "updated", "asc")] == [3, 1, 2]
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import RateLimitScheduler, TokenBucket, rate_limit_message, resource_for, secondary_limit_delay
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limit.time, "sleep", slept.append)
+    return slept
+
+
+def exhausted(reset_in):
+    return FakeResponse(403, {"X-RateLimit-Limit": "30", "X-RateLimit-Remaining": "0",
+                              "X-RateLimit-Reset": str(time.time() + reset_in)}, "API rate limit exceeded")
+
+
+def test_resource_for():
+    assert resource_for("https://api.github.com/search/issues?q=x") == "search"
+    assert resource_for("https://api.github.com/graphql") == "graphql"
+    assert resource_for("https://api.github.com/user/repos") == "core"
+
+
+def test_bucket_spends_budget_then_queues_behind_the_reset():
+    bucket = TokenBucket(limit=2, window=60)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 59 < bucket.reserve() <= 60
+
+
+def test_bucket_follows_github_headers():
+    bucket = TokenBucket(limit=30, window=60)
+    bucket.update({"X-RateLimit-Limit": "10", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 5)})
+    assert bucket.status()["limit"] == 10
+    assert 0 < bucket.reserve() <= 5
+
+
+def test_secondary_limit_delay():
+    assert secondary_limit_delay(FakeResponse(200), 0) is None
+    assert secondary_limit_delay(FakeResponse(403, text="Resource not accessible"), 0) is None
+    assert secondary_limit_delay(FakeResponse(429, {"Retry-After": "7"}), 0) == 7
+    assert secondary_limit_delay(FakeResponse(403, text="secondary rate limit"), 1) == 120
+
+
+def test_short_secondary_limit_is_retried(sleeps):
+    session = FakeSession([FakeResponse(429, {"Retry-After": "3"}), FakeResponse(200)])
+    response = RateLimitScheduler(max_wait=60).request(session, "GET", "https://api.github.com/search/issues")
+    assert response.status_code == 200
+    assert sleeps == [3.0]
+
+
+def test_exhausted_primary_limit_returns_at_once(sleeps):
+    session = FakeSession([exhausted(1800), exhausted(1800)])
+    scheduler = RateLimitScheduler(max_wait=60)
+
+    assert scheduler.request(session, "GET", "https://api.github.com/search/issues").status_code == 403
+    # The bucket now knows the reset is far away; the next request doesn't wait for it either
+    assert scheduler.request(session, "GET", "https://api.github.com/search/issues").status_code == 403
+    assert session.calls == 2
+    assert sleeps == []
+
+
+def test_rate_limit_message_names_the_reset():
+    assert rate_limit_message(FakeResponse(404)) is None
+    message = rate_limit_message(exhausted(90))
+    assert "rate limit" in message and "in about 90 s" in message
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import metrics
+
+
+# Directory for on-disk caches. Set COMMIT_CONNECT_CACHE_DIR to "" to keep everything in memory.
+CACHE_DIR = os.getenv("COMMIT_CONNECT_CACHE_DIR", ".cache")
+
+
+def cache_path(filename):
+    """Return the path of an on-disk cache file, or None if disk caching is disabled."""
+    if not CACHE_DIR:
+        return None
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a time-to-live and an optional SQLite tier.
+    Values must be JSON serializable. The in-memory tier is bounded by `maxsize`;
+    the SQLite tier (enabled by passing `db_path`) survives process restarts and,
+    if `disk_maxsize` is set, keeps only that many of the most recently written rows.
+    A `ttl` of None means entries never expire.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, db_path=None, table="cache", disk_maxsize=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_maxsize = disk_maxsize
+        self.table = table
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_created ON {table} (created)")
+            self._db.commit()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key, default=None):
+        value = self._lookup(key, _MISSING)
+        metrics.inc("cache_lookups_total", cache=self.table, result="misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+
+    def _lookup(self, key, default):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._data.move_to_end(key)
+                    return value
+                del self._data[key]
+
+            if self._db is None:
+                return default
+            row = self._db.execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            if self._expired(row[1]):
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._db.commit()
+                return default
+
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def set(self, key, value):
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), created),
+                )
+                if self.disk_maxsize is not None:
+                    self._db.execute(
+                        f"DELETE FROM {self.table} WHERE key IN "
+                        f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_maxsize,),
+                    )
+                self._db.commit()
+
+    def _remember(self, key, value, created):
+        self._data[key] = (value, created)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SizedLRU:
+    """Thread-safe in-memory LRU bounded by the total size, in bytes, of the values it holds."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        with self._lock:
+            if key in self._data:
+                self.used_bytes -= self._data.pop(key)[1]
+            # Values bigger than the whole budget are simply not cached
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.used_bytes -= evicted_size
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import json
+
+from utils.cache import SizedLRU
+
+
+# Rendered charts, keyed by a hash of the data they were drawn from
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+_figure_cache = SizedLRU(FIGURE_CACHE_BYTES)
+
+PIE_COLORS = ["#FF6F61", "#6B5B95", "#88B04B", "#FFA07A", "#20B2AA", "#FFB347", "#779ECB"]
+
+
+def data_key(name, data):
+    """Stable hash of a chart's input; DataFrames are hashed by content, everything else as JSON."""
+    digest = hashlib.sha256(name.encode("utf-8"))
+    if hasattr(data, "columns"):
+        import pandas as pd
+
+        digest.update(json.dumps([str(col) for col in data.columns]).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    else:
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def language_pie_png(lang_data):
+    """PNG bytes of the transparent "Your Top Languages" pie chart."""
+    key = data_key("language_pie", lang_data)
+    png = _figure_cache.get(key)
+    if png is not None:
+        return png
+
+    # 🎨 Beautified Transparent Pie Chart
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib as mpl
+
+    # Set a modern font theme
+    mpl.rcParams['font.family'] = 'sans-serif'
+    mpl.rcParams['font.size'] = 10
+
+    # Create Pie Chart with transparent background
+    fig, ax = plt.subplots(figsize=(6, 6), dpi=100, facecolor='none')
+    fig.patch.set_alpha(0.0)  # Transparent figure background
+    ax.set_facecolor('none')  # Transparent axis background
+
+    wedges, texts, autotexts = ax.pie(
+        lang_data.values(),
+        labels=lang_data.keys(),
+        autopct="%1.1f%%",
+        startangle=140,
+        colors=PIE_COLORS[:len(lang_data)],
+        wedgeprops={'edgecolor': 'white', 'linewidth': 2, 'antialiased': True},
+        textprops={'fontsize': 10, 'color': 'white'}
+    )
+
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_weight('bold')
+        autotext.set_size(9)
+
+    ax.axis("equal")
+    ax.set_title("Your Top Languages", fontsize=14, fontweight='bold', color="white")
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", transparent=True, bbox_inches="tight")
+    plt.close(fig)
+    png = buffer.getvalue()
+    _figure_cache.set(key, png, len(png))
+    return png
+
+
+def stars_bar_figure(df):
+    """Plotly bar chart of stars per repository."""
+    key = data_key("stars_bar", df)
+    fig = _figure_cache.get(key)
+    if fig is not None:
+        return fig
+
+    import plotly.express as px
+
+    fig = px.bar(
+        df.sort_values("Stars", ascending=False),
+        x="Stars",
+        y="Repository",
+        orientation="h",
+        color="Stars",
+        color_continuous_scale="Sunsetdark",
+        title="Repository Stars Overview",
+        labels={"Stars": "Star Count", "Repository": "Repository Name"},
+    )
+    fig.update_layout(
+        xaxis=dict(
+            range=[0, 20],
+            tickmode='linear',
+            tick0=0,
+            dtick=1  # Ensures integer steps
+        ),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(size=14),
+        title_x=0.5,
+    )
+    _figure_cache.set(key, fig, len(fig.to_json()))
+    return fig
+
+
+def commit_line_figure(commit_df):
+    """Plotly line chart of commits per date; `commit_df` has "date" and "commits" columns."""
+    key = data_key("commit_line", commit_df)
+    fig = _figure_cache.get(key)
+    if fig is not None:
+        return fig
+
+    import plotly.express as px
+
+    fig = px.line(
+        commit_df,
+        x="date",
+        y="commits",
+        title="Your GitHub Commit History",
+        markers=True,
+        line_shape="spline",
+        labels={"date": "Date", "commits": "Number of Commits"},
+    )
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(size=14),
+        title_x=0.5,
+        hovermode="x unified",
+    )
+    _figure_cache.set(key, fig, len(fig.to_json()))
+    return fig
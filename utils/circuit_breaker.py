@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is erroring.
+    closed:    calls go through; the outcomes of the last `window` calls are kept
+    open:      entered when at least `min_calls` of them exist and `error_rate` of them failed;
+               calls are refused for `cooldown` seconds
+    half-open: after the cooldown one trial call goes through; success closes the breaker,
+               failure opens it again. Only the trial decides: calls admitted before the breaker
+               opened may finish late, and their outcomes are ignored while it is open.
+    The trial is the next call its thread records; a trial that never reports back is replaced
+    after another cooldown.
+    """
+
+    def __init__(self, window=20, min_calls=5, error_rate=0.5, cooldown=30):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        # (thread id, start time) of the half-open trial call, if one is running
+        self._trial = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        """True if a call may be made now. In half-open state only one trial call is allowed at a time."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            if self._trial is not None and now - self._trial[1] < self.cooldown:
+                return False
+            self._trial = (threading.get_ident(), now)
+            return True
+
+    def record(self, ok):
+        """Record the outcome of an allowed call, from the thread that made it."""
+        with self._lock:
+            if self._opened_at is not None:
+                if self._trial is None or self._trial[0] != threading.get_ident():
+                    return
+                self._trial = None
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._opened_at = time.monotonic()
@@ -0,0 +1,31 @@
+# Commit-count buckets accepted by commit_counts, as pandas period aliases
+BUCKETS = {"Day": "D", "Week": "W", "Month": "M"}
+
+
+def commit_counts(commit_dates, freq="D", since=None, until=None):
+    """
+    Count commits per day, week or month in one vectorized pass.
+    :param commit_dates: Iterable of ISO 8601 timestamps, e.g. "2025-04-01T10:00:00Z"
+    :param freq: Pandas period alias: "D", "W" or "M"
+    :param since: Optional datetime (naive means UTC); earlier commits are dropped
+    :param until: Optional datetime (naive means UTC); later commits are dropped
+    :return: DataFrame with "date" (bucket start) and "commits" columns, sorted by date
+    """
+    import pandas as pd
+
+    dates = pd.to_datetime(pd.Series(list(commit_dates), dtype="object"), utc=True, errors="coerce").dropna()
+    if since is not None:
+        dates = dates[dates >= _utc(since)]
+    if until is not None:
+        dates = dates[dates <= _utc(until)]
+
+    buckets = dates.dt.tz_localize(None).dt.to_period(freq).dt.start_time
+    counts = buckets.value_counts().sort_index()
+    return counts.rename_axis("date").reset_index(name="commits")
+
+
+def _utc(value):
+    import pandas as pd
+
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
@@ -1,44 +1,190 @@
 import requests
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from urllib.parse import quote_plus
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.http_cache import http_cache
+from utils.metrics import metrics, timed
+from utils.rate_limit import rate_limit_message, scheduler
+from utils.search_index import search_index
 
 
-# Store token here
-token = None
+GITHUB_API_URL = "https://api.github.com"
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 20)
+# GitHub's secondary rate limits punish bursts of concurrent search requests, so keep this small.
+SEARCH_MAX_WORKERS = 3
+SEARCH_PAGE_SIZE = 50
+
+
+class GitHubClient:
+    """
+    GitHub REST client backed by a keep-alive requests.Session.
+    Create one per Streamlit session (see get_client) so tokens never leak between users.
+    GET requests go through a conditional-request cache unless `cache` is None, and every
+    request that reaches the network is paced by the shared rate-limit scheduler.
+    """
+
+    def __init__(self, token=None, timeout=DEFAULT_TIMEOUT, pool_size=16, max_retries=3, cache=http_cache):
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "commit-connect",
+        })
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.set_token(token)
+
+    def set_token(self, token):
+        self.token = token
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
+    def get(self, url, params=None, **kwargs):
+        """GET a full URL or an API path like "/user"."""
+        if not url.startswith("http"):
+            url = GITHUB_API_URL + url
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cache is None:
+            return self._send("GET", url, params=params, **kwargs)
+
+        key = self.cache.key(url, params, self.token)
+        entry = self.cache.lookup(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record("hits")
+            return self.cache.build_response(entry, url)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+        response = self._send("GET", url, params=params, headers=headers, **kwargs)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.record("revalidated")
+            return self.cache.build_response(self.cache.refresh(key, entry), url)
+        self.cache.record("misses")
+        self.cache.save(key, response)
+        return response
+
+    def post(self, url, json=None, **kwargs):
+        """POST to a full URL or an API path, e.g. "/graphql". Never cached."""
+        if not url.startswith("http"):
+            url = GITHUB_API_URL + url
+        kwargs.setdefault("timeout", self.timeout)
+        return self._send("POST", url, json=json, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        endpoint = endpoint_for(url)
+        with metrics.timer("github_request_duration_seconds", endpoint=endpoint):
+            try:
+                response = scheduler.request(self.session, method, url, token=self.token, **kwargs)
+            except requests.RequestException:
+                metrics.inc("github_requests_total", endpoint=endpoint, status="error")
+                raise
+        metrics.inc("github_requests_total", endpoint=endpoint, status=response.status_code)
+        metrics.inc("github_response_bytes_total", len(response.content), endpoint=endpoint)
+        return response
+
+    def rate_limit_status(self):
+        """Known remaining budget per resource (core, search, graphql) for this client's token."""
+        return scheduler.status(self.token)
+
+
+def endpoint_for(url):
+    """Low-cardinality metrics label for a GitHub URL, e.g. "/repos/{owner}/{repo}/issues"."""
+    parts = urlparse(url).path.strip("/").split("/")
+    if parts[0] == "repos" and len(parts) >= 3:
+        parts[1:3] = ["{owner}", "{repo}"]
+    elif parts[0] in ("users", "orgs") and len(parts) >= 2:
+        parts[1] = "{name}"
+    return "/" + "/".join("{id}" if part.isdigit() else part for part in parts)
+
+def get_client():
+    """
+    Return the GitHub client for the logged-in user of this Streamlit session.
+    Its token follows st.session_state.pat, so a PAT entered without pressing Login is still used.
+    """
+    pat = st.session_state.get("pat") or None
+    if "github_client" not in st.session_state:
+        st.session_state.github_client = GitHubClient(pat)
+    client = st.session_state.github_client
+    if client.token != pat:
+        client.set_token(pat)
+    return client
+
+def get_app_client():
+    """Return this session's client authenticated with the app token, used for public searches."""
+    if "github_app_client" not in st.session_state:
+        st.session_state.github_app_client = GitHubClient(st.secrets.get("token"))
+    return st.session_state.github_app_client
 
 def set_token(pat):
-    global token
-    token = pat
+    st.session_state.pat = pat
+    get_client()
 
+def get_http_cache_stats():
+    """Hit / revalidated / miss counters of the shared GitHub response cache."""
+    return http_cache.snapshot()
 
-def get_user_profile():
-    global token
+
+def get_user_profile(client=None):
     """Fetch authenticated user’s GitHub profile"""
-    url = "https://api.github.com/user"
-    headers = {"Authorization": f"token {token}"}
-    res = requests.get(url, headers=headers)
-    if res.status_code == 200:
+    client = client or get_client()
+    try:
+        res = client.get("/user")
+    except requests.RequestException:
+        res = None
+    if res is not None and res.status_code == 200:
         return res.json()
     else:
         st.error("Failed to fetch GitHub profile.")
         return None
     
-# Function to fetch repositories of the authenticated user
-def get_user_repos():
-    global token
-    headers = {"Authorization": f"token {token}"}
-    repos_url = "https://api.github.com/user/repos"
-    response = requests.get(repos_url, headers=headers)
+def paginate(url, params=None, client=None, per_page=100):
+    """
+    Lazily yield the items of a GitHub list endpoint, following Link: rel="next".
+    Only one page is held in memory at a time. Raises requests.HTTPError on a failed page.
+    """
+    client = client or get_client()
+    params = dict(params or {}, per_page=per_page)
+    while url:
+        response = client.get(url, params=params)
+        response.raise_for_status()
+        yield from response.json()
+        url = response.links.get("next", {}).get("url")
+        # The next URL already carries the query string
+        params = None
 
-    if response.status_code == 200:
-        return response.json()
-    else:
+def iter_user_repos(client=None):
+    """Yield every repository of the authenticated user, page by page."""
+    return paginate("/user/repos", client=client)
+
+# Function to fetch repositories of the authenticated user
+@timed("get_user_repos")
+def get_user_repos(client=None):
+    try:
+        return list(iter_user_repos(client))
+    except requests.RequestException:
         st.error("❌ Failed to fetch repositories. Please check your token.")
         return None
 
 # Function to count language usage across repositories
 def get_language_distribution(repos):
+    """Count primary languages over any iterable of repos, including a lazy iter_user_repos()."""
     language_count = {}
     for repo in repos:
         language = repo.get("language")
@@ -46,44 +192,73 @@ def get_language_distribution(repos):
             language_count[language] = language_count.get(language, 0) + 1
     return language_count
 
+def get_user_language_distribution(client=None):
+    """Stream the user's repos into a language count. Returns None if the repos could not be fetched."""
+    try:
+        return get_language_distribution(iter_user_repos(client))
+    except requests.RequestException:
+        st.error("❌ Failed to fetch repositories. Please check your token.")
+        return None
+
 # fecting repo by language 
 
-def search_repositories_by_language(languages=None, min_stars=0, recent_days=90,min_forks=0,sort_by="stars",order="desc"):
+@timed("search_repositories_by_language")
+def search_repositories_by_language(languages=None, min_stars=0, recent_days=90,min_forks=0,sort_by="stars",order="desc",client=None):
     """
     Search public repositories on GitHub based on language, stars, and updated date.
-    :param token: GitHub Personal Access Token
     :param languages: List of languages to filter repos
     :param min_stars: Minimum stars
     :param recent_days: Updated within recent_days
-    :return: List of recommended repositories
+    :param client: GitHubClient to use, defaults to the session's app-token client
+    :return: List of recommended repositories, or a dict with an "error" key if every language failed
     """
-    token = st.secrets["token"]
     if not languages:
         return {"error": "Please provide at least one language."}
 
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+    client = client or get_app_client()
 
     recent_cutoff = (datetime.utcnow() - timedelta(days=recent_days)).strftime("%Y-%m-%d")
 
-    results = []
-    for lang in languages:
-        query = f"language:{lang} stars:>={min_stars} forks:>={min_forks} pushed:>={recent_cutoff}"
-        encoded_query = quote_plus(query)  # This will encode spaces to '+'
-        
-        url = f"https://api.github.com/search/repositories?q={encoded_query}"
-        
-        if sort_by and order:
-            url += f"&sort={sort_by}&order={order}"
-        url += "&per_page=50"
-
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            results.extend(data.get("items", []))
-        else:
-            print(f"Error for {lang}: {response.status_code} - {response.json().get('message', '')}")
+    def search(lang):
+        return _search_language(client, lang, min_stars, min_forks, recent_cutoff, sort_by, order)
+
+    # pool.map keeps the input order, so results merge in the order languages were given
+    workers = min(SEARCH_MAX_WORKERS, len(languages))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_language = list(pool.map(search, languages))
+
+    errors = [repos for repos in per_language if not isinstance(repos, list)]
+    if errors and len(errors) == len(per_language):
+        return errors[0]
+    return [repo for repos in per_language if isinstance(repos, list) for repo in repos]
+
+def _search_language(client, lang, min_stars, min_forks, recent_cutoff, sort_by, order):
+    """Run the repository search for a single language and return its items, or a dict with an "error" key."""
+    query = f"language:{lang} stars:>={min_stars} forks:>={min_forks} pushed:>={recent_cutoff}"
+    # A recent identical or broader search is answered from the local index
+    cached = search_index.plan("repos", query, sort_by, order)
+    if cached is not None:
+        return cached
 
-    return results
\ No newline at end of file
+    encoded_query = quote_plus(query)  # This will encode spaces to '+'
+
+    url = f"{GITHUB_API_URL}/search/repositories?q={encoded_query}"
+
+    if sort_by and order:
+        url += f"&sort={sort_by}&order={order}"
+    url += f"&per_page={SEARCH_PAGE_SIZE}"
+
+    try:
+        response = client.get(url)
+    except requests.RequestException as e:
+        print(f"Error for {lang}: {e}")
+        return {"error": f"GitHub API request failed: {e}"}
+    if response.status_code == 200:
+        data = response.json()
+        items = data.get("items", [])
+        search_index.ingest("repos", query, items, page_size=SEARCH_PAGE_SIZE, sort_by=sort_by, order=order)
+        return items
+    else:
+        message = response.json().get('message', '')
+        print(f"Error for {lang}: {response.status_code} - {message}")
+        return {"error": rate_limit_message(response) or f"GitHub API error {response.status_code}: {message}"}
@@ -0,0 +1,158 @@
+import json
+
+import requests
+
+from utils.github_api import get_client
+from utils.metrics import timed
+
+
+GRAPHQL_URL = "/graphql"
+# Commit history nodes fetched per repository and query
+COMMITS_PER_REPO = 100
+# Repositories whose details are requested together in one aliased query
+DETAILS_PER_QUERY = 20
+
+REPO_INDEX_QUERY = """
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: 100, after: $cursor, ownerAffiliations: OWNER, privacy: PUBLIC,
+                 orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name stargazerCount forkCount pushedAt }
+    }
+  }
+}
+"""
+
+REPO_LANGUAGES_FIELDS = """
+    languages(first: 20, orderBy: {field: SIZE, direction: DESC}) {
+      edges { size node { name } }
+    }
+"""
+
+REPO_HISTORY_FIELDS = """
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(%s) {
+            pageInfo { hasNextPage endCursor }
+            nodes { oid committedDate }
+          }
+        }
+      }
+    }
+"""
+
+
+def run_query(query, variables=None, client=None):
+    """Run a GraphQL query and return its "data", or a dict with an "error" key."""
+    client = client or get_client()
+    try:
+        response = client.post(GRAPHQL_URL, json={"query": query, "variables": variables or {}})
+    except requests.RequestException as e:
+        return {"error": f"GitHub GraphQL request failed: {e}"}
+
+    if response.status_code != 200:
+        return {"error": f"GitHub GraphQL error {response.status_code}: {response.text}"}
+    payload = response.json()
+    if payload.get("errors"):
+        return {"error": "; ".join(err.get("message", "") for err in payload["errors"])}
+    return payload.get("data", {})
+
+
+@timed("fetch_repo_index")
+def fetch_repo_index(username, client=None):
+    """
+    List `username`'s public repositories with only the cheap fields: name, stars, forks and pushedAt.
+    Returns a list of {"name", "stars", "forks", "pushed_at"} or a dict with an "error" key.
+    """
+    repos = []
+    cursor = None
+    while True:
+        data = run_query(REPO_INDEX_QUERY, {"login": username, "cursor": cursor}, client=client)
+        if "error" in data:
+            return data
+        if not data.get("user"):
+            return {"error": f"GitHub user {username} not found."}
+
+        connection = data["user"]["repositories"]
+        repos.extend({
+            "name": node["name"],
+            "stars": node["stargazerCount"],
+            "forks": node["forkCount"],
+            "pushed_at": node["pushedAt"],
+        } for node in connection["nodes"])
+
+        if not connection["pageInfo"]["hasNextPage"]:
+            return repos
+        cursor = connection["pageInfo"]["endCursor"]
+
+
+@timed("fetch_repo_details")
+def fetch_repo_details(owner, wanted, client=None):
+    """
+    Fetch language bytes and commit history for a few named repositories, DETAILS_PER_QUERY per query.
+    History is paged through COMMITS_PER_REPO commits at a time until every commit since `since` is in,
+    so a busy repo never leaves a gap below the snapshot's watermark.
+    :param wanted: List of (repo name, since) pairs; `since` is an ISO 8601 string or None
+    :return: {name: {"languages": {name: bytes}, "commits": [(oid, committedDate)]}}
+             or a dict with an "error" key
+    """
+    details = {}
+    # (repo name, since, history cursor); no cursor means the first page, which also asks for languages
+    pending = [(name, since, None) for name, since in wanted]
+    while pending:
+        next_pages = []
+        for start in range(0, len(pending), DETAILS_PER_QUERY):
+            batch = pending[start:start + DETAILS_PER_QUERY]
+            aliases = [
+                f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{"
+                + _details_fields(since, cursor) + "}"
+                for i, (name, since, cursor) in enumerate(batch)
+            ]
+            data = run_query("query {\n" + "\n".join(aliases) + "\n}", client=client)
+            if "error" in data:
+                return data
+
+            for i, (name, since, cursor) in enumerate(batch):
+                node = data.get(f"r{i}")
+                if node is None:
+                    continue
+                if cursor is None:
+                    details[name] = {"languages": _parse_languages(node), "commits": []}
+                history = _history(node)
+                if history is None:
+                    continue
+                details[name]["commits"].extend((commit["oid"], commit["committedDate"]) for commit in history["nodes"])
+                if history["pageInfo"]["hasNextPage"]:
+                    next_pages.append((name, since, history["pageInfo"]["endCursor"]))
+        pending = next_pages
+    return details
+
+
+def _details_fields(since, cursor):
+    args = f"first: {COMMITS_PER_REPO}"
+    if since:
+        args += f", since: {json.dumps(since)}"
+    if cursor:
+        args += f", after: {json.dumps(cursor)}"
+    history = REPO_HISTORY_FIELDS % args
+    return history if cursor else REPO_LANGUAGES_FIELDS + history
+
+
+def git_timestamp(value):
+    """Format a datetime as a GraphQL GitTimestamp (UTC), passing None through."""
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ") if value is not None else None
+
+
+def _parse_languages(node):
+    return {edge["node"]["name"]: edge["size"] for edge in node["languages"]["edges"]}
+
+
+def _history(node):
+    branch = node.get("defaultBranchRef")
+    # Empty repositories have no default branch
+    if branch and branch.get("target") and "history" in branch["target"]:
+        return branch["target"]["history"]
+    return None
+
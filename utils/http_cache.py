@@ -0,0 +1,103 @@
+import hashlib
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.cache import TTLCache, cache_path
+from utils.metrics import metrics
+
+
+# Response headers replayed on cached responses. Rate-limit headers are left out on purpose.
+CACHED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified", "Cache-Control")
+
+
+class ConditionalCache:
+    """
+    ETag / Last-Modified cache for GitHub GET requests.
+    Bodies are stored on disk and revalidated with If-None-Match / If-Modified-Since;
+    a 304 reply does not count against GitHub's rate limit. Responses still inside their
+    Cache-Control max-age are served without touching the network at all.
+    """
+
+    def __init__(self, db_path=None, maxsize=512, disk_maxsize=20000):
+        self.store = TTLCache(maxsize=maxsize, ttl=None, db_path=db_path,
+                              table="http_responses", disk_maxsize=disk_maxsize)
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def key(self, url, params=None, token=None):
+        """Cache key for a request. The token is hashed in so users never see each other's data."""
+        token_hash = hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+        query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return f"{token_hash} {url}?{query}"
+
+    def lookup(self, key):
+        return self.store.get(key)
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched"] < entry["max_age"]
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(self, key, response):
+        """Store a 200 response if GitHub gave us a validator to revalidate it with."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+        self.store.set(key, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "max_age": parse_max_age(response.headers.get("Cache-Control", "")),
+            "fetched": time.time(),
+            "headers": {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+            "body": response.text,
+        })
+
+    def refresh(self, key, entry):
+        """Restart the freshness window of an entry GitHub just confirmed with a 304."""
+        entry = dict(entry, fetched=time.time())
+        self.store.set(key, entry)
+        return entry
+
+    def build_response(self, entry, url):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        return response
+
+    def record(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+        metrics.inc("cache_lookups_total", cache="github_http", result=outcome)
+
+    def snapshot(self):
+        """Counters plus the number of requests that did not spend rate-limit budget."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["rate_limit_saved"] = stats["hits"] + stats["revalidated"]
+        return stats
+
+
+def parse_max_age(cache_control):
+    """Return the max-age of a Cache-Control header in seconds, 0 if the response must be revalidated."""
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
+
+# Shared by every client in the process; keys are scoped per token.
+http_cache = ConditionalCache(db_path=cache_path("github_http_cache.sqlite3"))
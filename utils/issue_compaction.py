@@ -0,0 +1,79 @@
+import re
+
+
+# Input tokens of one issue body sent for summarization, after compaction
+SUMMARY_INPUT_TOKEN_BUDGET = 1500
+# Code fences and log / stack-trace runs longer than HEAD + TAIL lines keep only their ends
+HEAD_LINES = 8
+TAIL_LINES = 4
+
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)|<img\b[^>]*>", re.IGNORECASE)
+FENCE = re.compile(r"^([ \t]*)(```|~~~)[^\n]*\n.*?^\1\2[ \t]*$", re.MULTILINE | re.DOTALL)
+# Lines that look like log output or stack frames rather than prose
+LOG_LINE = re.compile(
+    r"^\s*(?:at\s+\S.*:\d+\)?$|File \".*\", line \d+|Traceback \(most recent call last\)|\d{4}-\d\d-\d\d[T ]\d\d:\d\d"
+    r"|\[?(?:DEBUG|INFO|WARN|WARNING|ERROR|FATAL|TRACE)\]?[\s:]|\w+(?:\.\w+)+(?:Error|Exception)\b|\s{4,}\S)"
+)
+# Issue-form sections left empty and template checklist confirmations carry no information
+EMPTY_SECTION = re.compile(r"^#{1,6}[^\n]*\n+(?:_No response_|N/A|None)\s*$", re.MULTILINE | re.IGNORECASE)
+CHECKLIST_ITEM = re.compile(
+    r"^\s*[-*] \[[ xX]\] .*(?:I have|I've|I agree|searched|code of conduct|contributing guide|latest version).*$",
+    re.MULTILINE | re.IGNORECASE,
+)
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for sizing batches."""
+    return len(text) // 4 + 1
+
+
+def compact_issue_body(body, token_budget=SUMMARY_INPUT_TOKEN_BUDGET):
+    """
+    Shrink an issue body before it is summarized, keeping the prose intact:
+      1. drop HTML comments (issue-template hints), images, empty form sections and checklists
+      2. cut long code fences and runs of log / stack-trace lines down to their head and tail
+      3. if it is still over `token_budget`, keep the start and end of the body
+    """
+    body = HTML_COMMENT.sub("", body)
+    body = IMAGE.sub("", body)
+    body = EMPTY_SECTION.sub("", body)
+    body = CHECKLIST_ITEM.sub("", body)
+    body = FENCE.sub(lambda match: _head_tail(match.group(0).split("\n"), keep_last=True), body)
+    body = _collapse_log_runs(body)
+    body = BLANK_LINES.sub("\n\n", body).strip()
+
+    max_chars = token_budget * 4
+    if len(body) > max_chars:
+        head = max_chars * 2 // 3
+        tail = max_chars - head
+        body = f"{body[:head]}\n\n[... {len(body) - max_chars} characters omitted ...]\n\n{body[-tail:]}"
+    return body
+
+
+def _head_tail(lines, keep_last=False):
+    """Keep the first HEAD_LINES and last TAIL_LINES lines (plus a fence's closing line)."""
+    closing = [lines.pop()] if keep_last else []
+    if len(lines) <= HEAD_LINES + TAIL_LINES + 1:
+        return "\n".join(lines + closing)
+    omitted = len(lines) - HEAD_LINES - TAIL_LINES
+    return "\n".join(lines[:HEAD_LINES] + [f"... {omitted} lines omitted ..."] + lines[-TAIL_LINES:] + closing)
+
+
+def _collapse_log_runs(body):
+    """Collapse runs of consecutive log / stack-trace lines outside code fences."""
+    out, run, in_fence = [], [], False
+    for line in body.split("\n"):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        if not in_fence and LOG_LINE.match(line):
+            run.append(line)
+            continue
+        if run:
+            out.append(_head_tail(run))
+            run = []
+        out.append(line)
+    if run:
+        out.append(_head_tail(run))
+    return "\n".join(out)
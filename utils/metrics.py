@@ -0,0 +1,231 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Optional exporters, both off by default:
+#   COMMIT_CONNECT_METRICS_FILE  rewrite this file in Prometheus text format every METRICS_EXPORT_INTERVAL
+#                                seconds (e.g. for node_exporter's textfile collector)
+#   COMMIT_CONNECT_METRICS_PORT  serve the same text at http://localhost:<port>/metrics
+METRICS_FILE = os.getenv("COMMIT_CONNECT_METRICS_FILE", "")
+METRICS_PORT = os.getenv("COMMIT_CONNECT_METRICS_PORT", "")
+METRICS_EXPORT_INTERVAL = 15
+
+HELP = {
+    "github_request_duration_seconds": "GitHub API request latency, including rate-limit waits and retries.",
+    "github_requests_total": "GitHub API responses by endpoint and HTTP status (\"error\" if no response).",
+    "github_response_bytes_total": "Bytes of GitHub API response bodies received.",
+    "github_rate_limit_remaining": "Lowest known remaining GitHub budget per resource across tokens.",
+    "function_duration_seconds": "Wall-clock time of instrumented GitHub and Gemini functions.",
+    "gemini_request_duration_seconds": "Latency of single Gemini attempts; streams are timed to the first chunk.",
+    "gemini_request_bytes_total": "Bytes of prompts sent to Gemini.",
+    "gemini_circuit_open": "1 while the Gemini circuit breaker refuses calls.",
+    "cache_lookups_total": "Cache lookups by cache and result.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus stores them."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Process-wide registry of counters, latency histograms and callback gauges.
+    Series are keyed by metric name plus a sorted tuple of label pairs.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    def gauge(self, name, callback):
+        """Register a gauge read at export time; `callback` returns a list of (labels dict, value)."""
+        with self._lock:
+            self._gauges[name] = callback
+
+    def timer(self, name, **labels):
+        """Context manager / decorator observing elapsed seconds into histogram `name`."""
+        return _Timer(self, name, labels)
+
+    def counters(self, name):
+        """[(labels dict, value)] of a counter."""
+        with self._lock:
+            return [(dict(labels), value) for (metric, labels), value in self._counters.items() if metric == name]
+
+    def histograms(self, name):
+        """[(labels dict, {"count", "mean", "p50", "p95"})] of a histogram, for display."""
+        with self._lock:
+            series = [(dict(labels), histogram) for (metric, labels), histogram in self._histograms.items()
+                      if metric == name]
+            return [(labels, {
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+            }) for labels, histogram in series]
+
+    def gauges(self, name):
+        with self._lock:
+            callback = self._gauges.get(name)
+        return callback() if callback else []
+
+    def to_prometheus(self):
+        """All series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            gauges = sorted(self._gauges)
+
+        described = set()
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for name in gauges:
+            header(name, "gauge")
+            for labels, value in self.gauges(name):
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Write then rename, so a scraper never reads a half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # As a decorator, every call gets its own timer so concurrent calls don't share a start time
+        return _Timer(self.registry, self.name, self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self._start, **self.labels)
+        return False
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+def timed(function_name):
+    """Decorator recording a function's wall-clock time as function_duration_seconds{function=...}."""
+    return metrics.timer("function_duration_seconds", function=function_name)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def start_exporters():
+    """Start the file and HTTP exporters configured by environment variables. Safe to call on every rerun."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if METRICS_FILE:
+        def write_forever():
+            while True:
+                metrics.write_prometheus(METRICS_FILE)
+                time.sleep(METRICS_EXPORT_INTERVAL)
+
+        threading.Thread(target=write_forever, name="metrics-file", daemon=True).start()
+
+    if METRICS_PORT:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", int(METRICS_PORT)), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
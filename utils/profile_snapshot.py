@@ -0,0 +1,145 @@
+import json
+import sqlite3
+import threading
+
+from utils.cache import cache_path
+from utils.github_graphql import fetch_repo_index, fetch_repo_details, git_timestamp
+from utils.metrics import timed
+
+
+class ProfileSnapshot:
+    """
+    SQLite snapshot of users' repositories, per-repo language bytes and commit dates.
+    The stored pushed_at of each repo and the newest stored commit act as watermarks,
+    so a refresh only asks GitHub about what changed since the last visit.
+    """
+
+    def __init__(self, db_path=None):
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS repos ("
+                "login TEXT NOT NULL, name TEXT NOT NULL, stars INTEGER, forks INTEGER, "
+                "pushed_at TEXT, languages TEXT NOT NULL, PRIMARY KEY (login, name))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS commits ("
+                "login TEXT NOT NULL, repo TEXT NOT NULL, oid TEXT NOT NULL, committed_at TEXT NOT NULL, "
+                "PRIMARY KEY (login, repo, oid))"
+            )
+
+    def pushed_at(self, login):
+        """{repo name: stored pushed_at} for every repo in the user's snapshot."""
+        with self._lock:
+            rows = self._db.execute("SELECT name, pushed_at FROM repos WHERE login = ?", (login,)).fetchall()
+        return dict(rows)
+
+    def watermark(self, login, repo):
+        """Newest stored commit date of a repo, or None if nothing is stored yet."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(committed_at) FROM commits WHERE login = ? AND repo = ?", (login, repo)
+            ).fetchone()
+        return row[0]
+
+    def update(self, login, index, details):
+        """
+        Store the latest repo index and the details fetched for changed repos.
+        Repos missing from the index (deleted or made private) are dropped.
+        """
+        names = [repo["name"] for repo in index]
+        with self._lock, self._db:
+            placeholders = ",".join("?" * len(names))
+            self._db.execute(
+                f"DELETE FROM repos WHERE login = ? AND name NOT IN ({placeholders})", (login, *names)
+            )
+            self._db.execute(
+                f"DELETE FROM commits WHERE login = ? AND repo NOT IN ({placeholders})", (login, *names)
+            )
+            for repo in index:
+                detail = details.get(repo["name"])
+                if detail is None:
+                    # Unchanged repo: refresh the counters, keep the stored languages
+                    self._db.execute(
+                        "UPDATE repos SET stars = ?, forks = ? WHERE login = ? AND name = ?",
+                        (repo["stars"], repo["forks"], login, repo["name"]),
+                    )
+                    continue
+                self._db.execute(
+                    "INSERT OR REPLACE INTO repos (login, name, stars, forks, pushed_at, languages) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (login, repo["name"], repo["stars"], repo["forks"], repo["pushed_at"],
+                     json.dumps(detail["languages"])),
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO commits (login, repo, oid, committed_at) VALUES (?, ?, ?, ?)",
+                    [(login, repo["name"], oid, committed_at) for oid, committed_at in detail["commits"]],
+                )
+
+    def prune(self, login, before):
+        """Drop stored commits older than `before` (ISO 8601); they are outside every plotted window."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM commits WHERE login = ? AND committed_at < ?", (login, before))
+
+    def load(self, login, since=None):
+        """
+        The user's repos as {"name", "stars", "forks", "languages": {name: bytes}, "commit_dates": [ISO 8601 str]},
+        with commit dates from `since` (ISO 8601) on.
+        """
+        with self._lock:
+            repos = self._db.execute(
+                "SELECT name, stars, forks, languages FROM repos WHERE login = ? ORDER BY name", (login,)
+            ).fetchall()
+            commits = self._db.execute(
+                "SELECT repo, committed_at FROM commits WHERE login = ? AND committed_at >= ?",
+                (login, since or ""),
+            ).fetchall()
+
+        commit_dates = {}
+        for repo, committed_at in commits:
+            commit_dates.setdefault(repo, []).append(committed_at)
+        return [{
+            "name": name,
+            "stars": stars,
+            "forks": forks,
+            "languages": json.loads(languages),
+            "commit_dates": commit_dates.get(name, []),
+        } for name, stars, forks, languages in repos]
+
+
+profile_snapshot = ProfileSnapshot(cache_path("profile_snapshots.sqlite3"))
+
+
+@timed("refresh_profile_repos")
+def refresh_profile_repos(username, client=None, since=None, snapshot=None):
+    """
+    Fetch `username`'s public repos with stars, forks, language bytes and commit dates from `since` on.
+    Incremental: one cheap index query lists the repos, and only repos whose pushedAt changed since
+    the last snapshot are re-queried, for commits newer than their watermark (or the window start).
+    Returns a list of repo dicts (see ProfileSnapshot.load) or a dict with an "error" key.
+    """
+    snapshot = snapshot or profile_snapshot
+    index = fetch_repo_index(username, client=client)
+    if "error" in index:
+        return index
+
+    known = snapshot.pushed_at(username)
+    window_start = git_timestamp(since)
+    changed = []
+    for repo in index:
+        name = repo["name"]
+        if name in known and known[name] == repo["pushed_at"]:
+            continue
+        # Commits at the watermark come back again; the (repo, oid) key drops the duplicate
+        starts = [start for start in (snapshot.watermark(username, name), window_start) if start]
+        changed.append((name, max(starts) if starts else None))
+
+    details = fetch_repo_details(username, changed, client=client) if changed else {}
+    if "error" in details:
+        return details
+
+    snapshot.update(username, index, details)
+    if window_start:
+        snapshot.prune(username, before=window_start)
+    return snapshot.load(username, since=window_start)
@@ -0,0 +1,172 @@
+import re
+
+
+# term -> canonical name. Terms are matched case-insensitively on word boundaries.
+LANGUAGES = {
+    "python": "Python", "javascript": "JavaScript", "js": "JavaScript", "typescript": "TypeScript",
+    "ts": "TypeScript", "java": "Java", "kotlin": "Kotlin", "swift": "Swift", "ruby": "Ruby",
+    "php": "PHP", "golang": "Go", "go": "Go", "rust": "Rust", "c++": "C++", "cpp": "C++",
+    "c#": "C#", "csharp": "C#", "c": "C", "scala": "Scala", "dart": "Dart", "elixir": "Elixir",
+    "haskell": "Haskell", "lua": "Lua", "julia": "Julia", "r": "R", "shell": "Shell", "bash": "Shell",
+    "html": "HTML", "css": "CSS", "sql": "SQL",
+}
+# Short language names that are also ordinary words; these only match when capitalized in the prompt.
+CASE_SENSITIVE_TERMS = {"go": "Go", "c": "C", "r": "R", "ts": "TS", "js": "JS"}
+
+# term -> (canonical name, implied language or None)
+FRAMEWORKS = {
+    "django": ("Django", "Python"), "flask": ("Flask", "Python"), "fastapi": ("FastAPI", "Python"),
+    "streamlit": ("Streamlit", "Python"), "pandas": ("Pandas", "Python"), "numpy": ("NumPy", "Python"),
+    "pytorch": ("PyTorch", "Python"), "tensorflow": ("TensorFlow", "Python"),
+    "rails": ("Rails", "Ruby"), "ruby on rails": ("Rails", "Ruby"), "laravel": ("Laravel", "PHP"),
+    "spring": ("Spring", "Java"), "spring boot": ("Spring Boot", "Java"),
+    "flutter": ("Flutter", "Dart"), "phoenix": ("Phoenix", "Elixir"),
+    "react": ("React", None), "react native": ("React Native", None), "vue": ("Vue", None),
+    "vue.js": ("Vue", None), "angular": ("Angular", None), "svelte": ("Svelte", None),
+    "next.js": ("Next.js", None), "nextjs": ("Next.js", None), "node": ("Node", None),
+    "node.js": ("Node", None), "express": ("Express", None), "redux": ("Redux", None),
+    "d3.js": ("D3.js", None), "d3": ("D3.js", None), "plotly": ("Plotly", None),
+    "tailwind": ("Tailwind", None), "bootstrap": ("Bootstrap", None), "graphql": ("GraphQL", None),
+    ".net": (".NET", "C#"), "dotnet": (".NET", "C#"),
+}
+
+TOOLS = {
+    "docker": "Docker", "kubernetes": "Kubernetes", "k8s": "Kubernetes", "git": "Git",
+    "github actions": "GitHub Actions", "terraform": "Terraform", "ansible": "Ansible",
+    "webpack": "Webpack", "vite": "Vite", "jest": "Jest", "pytest": "pytest", "postgres": "PostgreSQL",
+    "postgresql": "PostgreSQL", "mysql": "MySQL", "mongodb": "MongoDB", "redis": "Redis",
+    "aws": "AWS", "gcp": "GCP", "azure": "Azure", "vscode": "VS Code", "vs code": "VS Code",
+}
+
+DIFFICULTY = {
+    "beginner": "Beginner", "beginners": "Beginner", "beginner-friendly": "Beginner", "newbie": "Beginner",
+    "easy": "Beginner", "simple": "Beginner", "starter": "Beginner", "first issue": "Beginner",
+    "good first issue": "Beginner", "first-timer": "Beginner", "new to": "Beginner",
+    "intermediate": "Intermediate", "help wanted": "Intermediate", "medium": "Intermediate",
+    "advanced": "Advanced", "expert": "Advanced", "hard": "Advanced", "challenging": "Advanced",
+}
+
+# term -> tag added to other_filters
+OTHER_FILTERS = {
+    "bug": "bug", "bugs": "bug", "bugfix": "bug", "fixing bugs": "bug",
+    "test": "testing", "tests": "testing", "testing": "testing", "unit tests": "testing",
+    "docs": "documentation", "documentation": "documentation",
+    "ui": "UI", "ux": "UX", "frontend": "frontend", "front-end": "frontend",
+    "backend": "backend", "back-end": "backend", "api": "API", "apis": "API",
+    "authentication": "authentication", "auth": "authentication", "security": "security",
+    "performance": "performance", "accessibility": "accessibility", "a11y": "accessibility",
+    "animations": "animations", "animation": "animations", "refactor": "refactoring",
+    "refactoring": "refactoring", "machine learning": "machine learning", "ml": "machine learning",
+    "data visualization": "data visualization", "dashboards": "dashboards", "dashboard": "dashboards",
+    "ci/cd": "CI/CD", "ci": "CI/CD", "cli": "CLI", "mobile": "mobile", "game": "game", "games": "game",
+    "feature": "enhancement", "features": "enhancement", "enhancement": "enhancement",
+}
+
+NEGATION_CUE = re.compile(
+    r"(?:\bno|\bnot|\bwithout|\bavoid(?:ing|s)?|\bexcept|\bnothing with|\bdon'?t (?:want|use|like)|\bexclude)"
+    r"\s+(?:any\s+|using\s+|use\s+|the\s+)?$"
+)
+
+# Words that carry no filter information and don't lower confidence when left unmatched
+STOPWORDS = set("""
+a an and any are as at be but by can could do for from get give good have i i'm im in into is it
+its just like looking me more my of on or out please prefer preferably projects project repos repo
+repositories repository issues issue some something suggest that the them this to use using want
+we which with would you your related contribute contributing contribution work working find show
+open source open-source stuff things maybe also no not without avoid nothing don't dont really
+app apps fix fixes fixing help improve improvements cool nice love
+""".split())
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./'-]*")
+
+# Below this confidence the prompt is handed to Gemini
+MIN_CONFIDENCE = 0.75
+
+
+_TERMS = {}
+for _term, _canonical in LANGUAGES.items():
+    _TERMS[_term] = ("language", (_canonical, None))
+for _term, _value in FRAMEWORKS.items():
+    _TERMS[_term] = ("framework", _value)
+for _term, _canonical in TOOLS.items():
+    _TERMS[_term] = ("tool", (_canonical, None))
+for _term, _canonical in DIFFICULTY.items():
+    _TERMS[_term] = ("difficulty", (_canonical, None))
+for _term, _canonical in OTHER_FILTERS.items():
+    _TERMS[_term] = ("filter", (_canonical, None))
+# One alternation, longest terms first so "ruby on rails" wins over "rails" and "react native" over "react"
+_TERM_PATTERN = re.compile(
+    r"(?<![\w.+#])(" + "|".join(re.escape(term) for term in sorted(_TERMS, key=len, reverse=True)) + r")(?![\w+#]|\.\w)"
+)
+# Text between two terms that carries a negation over, as in "no Redux or GraphQL"
+NEGATION_CHAIN = re.compile(r"^\s*(?:,|/)?\s*(?:or|nor)?\s*$")
+
+
+def parse_prompt_locally(text):
+    """
+    Extract filters from a prompt with the curated lexicons above, without calling an LLM.
+    Returns (parsed, confidence): `parsed` has the same shape as gemini.parse_user_prompt,
+    and `confidence` is the share of meaningful words the lexicons could explain (0..1).
+    """
+    lowered = text.lower()
+    taken = [False] * len(lowered)
+    languages, frameworks, tools, other_filters = [], [], [], []
+    difficulty = None
+    previous_end, previous_negated = 0, False
+
+    for match in _TERM_PATTERN.finditer(lowered):
+        term = match.group(1)
+        start, end = match.span(1)
+        if term in CASE_SENSITIVE_TERMS and text[start:end] != CASE_SENSITIVE_TERMS[term]:
+            continue
+        taken[start:end] = [True] * (end - start)
+
+        kind, (canonical, implied_language) = _TERMS[term]
+        negated = bool(NEGATION_CUE.search(lowered[:start])) or (
+            previous_negated and NEGATION_CHAIN.match(lowered[previous_end:start]) is not None
+        )
+        previous_end, previous_negated = end, negated
+
+        if negated:
+            _add(other_filters, f"no {canonical}")
+        elif kind == "language":
+            _add(languages, canonical)
+        elif kind == "framework":
+            _add(frameworks, canonical)
+            if implied_language:
+                _add(languages, implied_language)
+        elif kind == "tool":
+            _add(tools, canonical)
+        elif kind == "difficulty":
+            difficulty = difficulty or canonical
+        else:
+            _add(other_filters, canonical)
+
+    # Negated languages win over ones implied by a framework
+    languages = [lang for lang in languages if f"no {lang}" not in other_filters]
+
+    content, explained = 0, 0
+    for match in TOKEN.finditer(lowered):
+        word = match.group(0).strip(".'-")
+        if not word or word in STOPWORDS:
+            continue
+        content += 1
+        if taken[match.start()]:
+            explained += 1
+    confidence = explained / content if content else 0.0
+    if not (languages or frameworks or tools or difficulty or other_filters):
+        confidence = 0.0
+
+    parsed = {
+        "languages": languages,
+        "frameworks and libraries": frameworks,
+        "tools": tools,
+        "difficulty": difficulty,
+        "other_filters": other_filters,
+    }
+    return parsed, confidence
+
+
+def _add(items, value):
+    if value not in items:
+        items.append(value)
@@ -0,0 +1,77 @@
+import re
+
+
+# Qualifiers of the form `field:>=value` that can only narrow a search when raised
+RANGE_FIELDS = ("stars", "forks", "pushed", "updated")
+QUALIFIER = re.compile(r'(-?[\w]+):("[^"]*"|\S+)')
+
+# Item fields each range qualifier is checked against; dates compare as YYYY-MM-DD strings
+ITEM_FIELDS = {
+    "stars": lambda item: item.get("stargazers_count", 0),
+    "forks": lambda item: item.get("forks_count", 0),
+    "pushed": lambda item: (item.get("pushed_at") or "")[:10],
+    "updated": lambda item: (item.get("updated_at") or "")[:10],
+}
+
+# Local sort key for each GitHub `sort` value
+SORT_KEYS = {
+    "stars": lambda item: item.get("stargazers_count", 0),
+    "forks": lambda item: item.get("forks_count", 0),
+    "updated": lambda item: item.get("updated_at") or "",
+    "created": lambda item: item.get("created_at") or "",
+    "comments": lambda item: item.get("comments", 0),
+}
+
+
+def parse_query(query):
+    """
+    Split a GitHub search query into:
+      base      - qualifiers that must match exactly (language, labels, state, ...)
+      ranges    - {field: lower bound} for `stars:>=`, `forks:>=`, `pushed:>=`, `updated:>=`
+      assignee  - "assigned", "unassigned" or "all"
+    """
+    base, ranges, assignee = [], {}, "all"
+    for field, value in QUALIFIER.findall(query):
+        if field in RANGE_FIELDS and value.startswith(">="):
+            bound = value[2:]
+            ranges[field] = int(bound) if bound.isdigit() else bound
+        elif field == "assignee" and value == "*":
+            assignee = "assigned"
+        elif field == "no" and value == "assignee":
+            assignee = "unassigned"
+        else:
+            base.append(f"{field}:{value}")
+    return sorted(base), ranges, assignee
+
+
+def covers(cached_query, new_query):
+    """True if every result of `new_query` is also a result of `cached_query`."""
+    cached_base, cached_ranges, cached_assignee = parse_query(cached_query)
+    new_base, new_ranges, new_assignee = parse_query(new_query)
+    if cached_base != new_base:
+        return False
+    if cached_assignee != "all" and cached_assignee != new_assignee:
+        return False
+    for field, cached_bound in cached_ranges.items():
+        new_bound = new_ranges.get(field)
+        if new_bound is None or type(new_bound) is not type(cached_bound) or new_bound < cached_bound:
+            return False
+    return True
+
+
+def matches(query, item):
+    """Apply a query's range and assignee qualifiers to one item locally."""
+    _, ranges, assignee = parse_query(query)
+    if assignee == "assigned" and not item.get("assignees"):
+        return False
+    if assignee == "unassigned" and item.get("assignees"):
+        return False
+    return all(ITEM_FIELDS[field](item) >= bound for field, bound in ranges.items())
+
+
+def sort_items(items, sort_by=None, order="desc"):
+    """Re-sort items the way GitHub would for `sort_by`; best match keeps the given order."""
+    key = SORT_KEYS.get(sort_by)
+    if key is None:
+        return list(items)
+    return sorted(items, key=key, reverse=(order != "asc"))
@@ -0,0 +1,167 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+
+from utils.metrics import metrics
+
+# Budgets assumed before GitHub has told us the real numbers: (requests, window in seconds)
+DEFAULT_BUDGETS = {
+    "core": (5000, 3600),
+    "search": (30, 60),
+    "graphql": (5000, 3600),
+}
+# Longest we block a Streamlit script waiting for budget. A request that would need a longer
+# wait is sent (or its rate-limited response returned) at once, so the UI can show the reset time.
+MAX_WAIT = 60
+# Retries after a 403/429 secondary rate limit
+MAX_RETRIES = 2
+
+
+def resource_for(url):
+    """Map a GitHub API URL to the rate-limit resource it is billed against."""
+    if "/search/" in url:
+        return "search"
+    if url.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class TokenBucket:
+    """Remaining requests for one token and resource, corrected from X-RateLimit-* headers."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one request from the bucket and return how long to wait before sending it."""
+        with self._lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.remaining = self.limit
+                self.reset_at = now + self.window
+            if self.remaining > 0:
+                self.remaining -= 1
+                return 0.0
+            # Out of budget: queue this request behind the reset and spend from the next window
+            wait = self.reset_at - now
+            self.reset_at += self.window
+            self.remaining = self.limit - 1
+            return wait
+
+    def update(self, headers):
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            self.limit = limit
+            self.remaining = remaining
+            self.reset_at = reset_at
+
+    def status(self):
+        with self._lock:
+            return {"limit": self.limit, "remaining": self.remaining, "reset": self.reset_at}
+
+
+class RateLimitScheduler:
+    """
+    Sends every GitHub request through per-token, per-resource budgets.
+    Requests are delayed rather than failed when a budget frees up within max_wait, and
+    403/429 rate limits are retried after Retry-After if that is no longer than max_wait.
+    """
+
+    def __init__(self, max_wait=MAX_WAIT, max_retries=MAX_RETRIES):
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, token, resource):
+        key = (_token_key(token), resource)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(*DEFAULT_BUDGETS[resource])
+            return self._buckets[key]
+
+    def request(self, session, method, url, token=None, **kwargs):
+        resource = resource_for(url)
+        bucket = self.bucket(token, resource)
+        for attempt in range(self.max_retries + 1):
+            self._sleep(bucket.reserve())
+            response = session.request(method, url, **kwargs)
+            bucket.update(response.headers)
+
+            delay = secondary_limit_delay(response, attempt)
+            if delay is None or attempt == self.max_retries or delay > self.max_wait:
+                return response
+            self._sleep(delay)
+        return response
+
+    def lowest_remaining(self):
+        """{resource: smallest remaining budget over all tokens}, for metrics."""
+        with self._lock:
+            buckets = list(self._buckets.items())
+        lowest = {}
+        for (_, resource), bucket in buckets:
+            remaining = bucket.status()["remaining"]
+            lowest[resource] = min(remaining, lowest.get(resource, remaining))
+        return lowest
+
+    def status(self, token):
+        """Current budget of every resource used with `token`, for display in the UI."""
+        token_key = _token_key(token)
+        with self._lock:
+            buckets = {resource: bucket for (key, resource), bucket in self._buckets.items() if key == token_key}
+        return {resource: bucket.status() for resource, bucket in buckets.items()}
+
+    def _sleep(self, seconds):
+        # Waits past max_wait are skipped: GitHub answers at once, with the reset time
+        if 0 < seconds <= self.max_wait:
+            time.sleep(seconds)
+
+
+def secondary_limit_delay(response, attempt):
+    """Seconds to wait before retrying a rate-limited response, or None if it was not rate limited."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = response.headers.get("X-RateLimit-Reset")
+        if reset is not None:
+            return max(float(reset) - time.time(), 1)
+    if response.status_code == 429 or "rate limit" in response.text.lower():
+        # GitHub asks for at least a minute between retries when no header says otherwise
+        return 60 * (2 ** attempt)
+    return None
+
+
+def rate_limit_message(response):
+    """A user-facing note on when a rate-limited response's budget frees up, or None."""
+    delay = secondary_limit_delay(response, 0)
+    if delay is None:
+        return None
+    reset = datetime.fromtimestamp(time.time() + delay).strftime("%H:%M:%S")
+    return f"GitHub rate limit reached; try again after {reset} (in about {math.ceil(delay)} s)."
+
+
+def _token_key(token):
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+
+# Shared by every client in the process; budgets are tracked per token.
+scheduler = RateLimitScheduler()
+metrics.gauge("github_rate_limit_remaining",
+              lambda: [({"resource": resource}, remaining) for resource, remaining in scheduler.lowest_remaining().items()])
@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+
+from utils.cache import SizedLRU
+
+
+# Weight of each feature in the match score; pass `weights` to rerank to override some of them.
+#   language    share of the user's repos written in the candidate's language
+#   labels      candidate is tagged as newcomer-friendly, or with a topic in the user's languages
+#   stars/forks log-scaled popularity, relative to the most popular candidate
+#   recency     halves every RECENCY_HALF_LIFE days since the last push / update
+#   unassigned  issue nobody has picked up yet
+#   relevance   combined search rank from find_github_issues
+DEFAULT_WEIGHTS = {
+    "language": 3.0,
+    "labels": 1.0,
+    "stars": 1.0,
+    "forks": 0.5,
+    "recency": 1.0,
+    "unassigned": 1.5,
+    "relevance": 2.0,
+}
+FEATURES = tuple(DEFAULT_WEIGHTS)
+RECENCY_HALF_LIFE = 30
+WELCOMING_LABELS = {"good first issue", "good-first-issue", "help wanted", "help-wanted",
+                    "beginner", "beginner-friendly", "easy", "first-timers-only"}
+
+# Feature matrices of recent candidate lists, so a rerun over the same results only pays for
+# the weighted sum. Keyed on each item's id, timestamp and relevance plus the skill vector.
+MATRIX_CACHE_BYTES = 16 * 1024 * 1024
+_matrix_cache = SizedLRU(MATRIX_CACHE_BYTES)
+
+
+def skill_vector(language_distribution):
+    """Normalize a {language: repo count} distribution to lowercase {language: share}."""
+    total = sum(language_distribution.values()) or 1
+    return {lang.lower(): count / total for lang, count in language_distribution.items()}
+
+
+def feature_matrix(items, skills, now=None):
+    """
+    One row per repo or issue search item, one column per FEATURES entry, each scaled to [0, 1].
+    Features an item doesn't have (stars on an issue, assignees on a repo) are 0.
+    """
+    import numpy as np
+
+    now = now or datetime.now(timezone.utc)
+    # The only per-item Python work: pull the raw fields out of the JSON dicts in one pass
+    raw, stamps = [], []
+    for item in items:
+        tags = [label["name"].lower() for label in item.get("labels") or ()]
+        tags += [topic.lower() for topic in item.get("topics") or ()]
+        # An issue has no language of its own; a label naming one of the user's languages stands in for it
+        language = skills.get((item.get("language") or "").lower(), 0.0)
+        for tag in tags:
+            language = max(language, skills.get(tag, 0.0))
+        raw.append((
+            language,
+            any(tag in WELCOMING_LABELS or tag in skills for tag in tags),
+            item.get("stargazers_count", 0),
+            item.get("forks_count", 0),
+            "assignees" in item and not item["assignees"],
+            item.get("relevance", 0.0),
+        ))
+        # Timestamps look like 2025-04-01T10:00:00Z; numpy parses them once the "Z" is dropped
+        stamps.append((item.get("pushed_at") or item.get("updated_at") or "NaT")[:19])
+
+    if not raw:
+        return np.zeros((0, len(FEATURES)))
+    language, labels, stars, forks, unassigned, relevance = np.array(raw, dtype=float).T
+    age_days = (np.datetime64(now.replace(tzinfo=None), "s") - np.array(stamps, dtype="datetime64[s]")) \
+        / np.timedelta64(1, "D")
+    recency = np.nan_to_num(0.5 ** (np.clip(age_days, 0, None) / RECENCY_HALF_LIFE))
+
+    matrix = np.column_stack([language, labels, np.log1p(stars), np.log1p(forks), recency, unassigned, relevance])
+    peak = matrix.max(axis=0)
+    return matrix / np.where(peak > 0, peak, 1.0)
+
+
+def rerank(items, language_distribution, weights=None):
+    """
+    Order repos or issues by how well they match the user's skills, best first.
+    :param items: Repo or issue dicts from GitHub search
+    :param language_distribution: {language: repo count}, as from get_language_distribution
+    :param weights: Optional {feature: weight} overriding DEFAULT_WEIGHTS
+    :return: New list of the same items; ties keep their incoming order
+    """
+    import numpy as np
+
+    if not items or not language_distribution:
+        return list(items)
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    weight_vector = np.array([weights[feature] for feature in FEATURES], dtype=float)
+
+    skills = skill_vector(language_distribution)
+    key = (
+        tuple(sorted(skills.items())),
+        tuple((item["id"], item.get("pushed_at") or item.get("updated_at"), item.get("relevance")) for item in items),
+    )
+    matrix = _matrix_cache.get(key)
+    if matrix is None:
+        matrix = feature_matrix(items, skills)
+        _matrix_cache.set(key, matrix, matrix.nbytes)
+    scores = matrix @ weight_vector
+    order = np.argsort(-scores, kind="stable")
+    return [items[i] for i in order.tolist()]
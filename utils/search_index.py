@@ -0,0 +1,201 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from utils.cache import cache_path
+from utils.metrics import metrics
+from utils.prompt_parser import STOPWORDS
+from utils.query_planner import covers, matches, sort_items
+
+
+# How long a remote search result is trusted before going back to GitHub (seconds)
+FRESHNESS = {"repos": 15 * 60, "issues": 10 * 60}
+
+
+class SearchIndex:
+    """
+    Local SQLite + FTS5 index of repositories and issues fetched from GitHub search.
+    Every remote search is recorded with the items it returned, so while it is fresh a repeat
+    of that search, or a narrower search a complete result set contains, is answered locally
+    (see plan). The text of everything fetched so far can also be searched without spending
+    search rate limit (see search_text).
+    """
+
+    def __init__(self, db_path=None, freshness=FRESHNESS):
+        self.freshness = freshness
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS repos (
+                    id INTEGER PRIMARY KEY, full_name TEXT, language TEXT, stars INTEGER, forks INTEGER,
+                    pushed_at TEXT, updated_at TEXT, item TEXT NOT NULL);
+                CREATE VIRTUAL TABLE IF NOT EXISTS repos_fts USING fts5(full_name, description, topics, language);
+                CREATE TABLE IF NOT EXISTS issues (
+                    id INTEGER PRIMARY KEY, repository TEXT, labels TEXT, state TEXT, assigned INTEGER,
+                    comments INTEGER, created_at TEXT, updated_at TEXT, item TEXT NOT NULL);
+                CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(title, body, labels);
+                CREATE TABLE IF NOT EXISTS queries (
+                    kind TEXT NOT NULL, key TEXT NOT NULL, fetched_at REAL NOT NULL,
+                    complete INTEGER NOT NULL DEFAULT 0, sort TEXT, PRIMARY KEY (kind, key));
+                CREATE TABLE IF NOT EXISTS query_items (
+                    kind TEXT NOT NULL, key TEXT NOT NULL, rank INTEGER NOT NULL, item_id INTEGER NOT NULL,
+                    PRIMARY KEY (kind, key, item_id));
+            """)
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(queries)")]
+            if "complete" not in columns:
+                self._db.execute("ALTER TABLE queries ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+            if "sort" not in columns:
+                # Searches recorded before the sort was stored match no sort order
+                self._db.execute("ALTER TABLE queries ADD COLUMN sort TEXT")
+
+    def ingest(self, kind, key, items, page_size=None, sort_by=None, order="desc"):
+        """
+        Store the items a remote search returned, in the sort order they were requested in,
+        and remember the search as fresh. A search that returned fewer items than `page_size`
+        holds its complete result set, so other sort orders and narrower searches can be
+        answered from it.
+        """
+        complete = page_size is not None and len(items) < page_size
+        with self._lock, self._db:
+            for item in items:
+                if kind == "repos":
+                    self._upsert_repo(item)
+                else:
+                    self._upsert_issue(item)
+            self._db.execute("DELETE FROM query_items WHERE kind = ? AND key = ?", (kind, key))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO query_items (kind, key, rank, item_id) VALUES (?, ?, ?, ?)",
+                [(kind, key, rank, item["id"]) for rank, item in enumerate(items)],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries (kind, key, fetched_at, complete, sort) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, time.time(), int(complete), sort_label(sort_by, order)),
+            )
+
+    def is_fresh(self, kind, key, sort_by=None, order="desc"):
+        """
+        True if the search was fetched recently and its items can be served in this sort order:
+        a truncated page only in the order GitHub returned it, a complete result set in any order.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetched_at, complete, sort FROM queries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        if row is None or time.time() - row[0] >= self.freshness[kind]:
+            return False
+        return bool(row[1]) or row[2] == sort_label(sort_by, order)
+
+    def plan(self, kind, key, sort_by=None, order="desc"):
+        """
+        Answer a search locally if possible, or return None if GitHub must be asked.
+          1. the same search is fresh in this sort order, or complete: reuse its items, re-sorted locally
+          2. a fresh, complete search covers this one (e.g. lower min stars, more days):
+             filter its items with this search's qualifiers, then re-sort
+        A truncated page is never re-sorted: the top 50 by stars reversed are not the 50 fewest-starred.
+        """
+        if self.is_fresh(kind, key, sort_by, order):
+            metrics.inc("cache_lookups_total", cache=f"search_{kind}", result="hits")
+            return sort_items(self._items(kind, key), sort_by, order)
+
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT key FROM queries WHERE kind = ? AND complete = 1 AND fetched_at > ? ORDER BY fetched_at DESC",
+                (kind, time.time() - self.freshness[kind]),
+            ).fetchall()
+        for (cached_key,) in candidates:
+            if covers(cached_key, key):
+                metrics.inc("cache_lookups_total", cache=f"search_{kind}", result="narrowed")
+                items = [item for item in self._items(kind, cached_key) if matches(key, item)]
+                return sort_items(items, sort_by, order)
+        metrics.inc("cache_lookups_total", cache=f"search_{kind}", result="misses")
+        return None
+
+    def _items(self, kind, key):
+        """Items a recorded search returned, in GitHub's original order."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT t.item FROM query_items q JOIN {kind} t ON t.id = q.item_id "
+                f"WHERE q.kind = ? AND q.key = ? ORDER BY q.rank",
+                (kind, key),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_items(self, kind, ids):
+        """Indexed items with the given ids, in the order of `ids`; unknown ids are skipped."""
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._db.execute(f"SELECT id, item FROM {kind} WHERE id IN ({placeholders})", list(ids)).fetchall()
+        items = {row[0]: json.loads(row[1]) for row in rows}
+        return [items[i] for i in ids if i in items]
+
+    def search_text(self, kind, text, limit=50, state=None, assigned=None, language=None, min_stars=0):
+        """Full-text search over everything indexed so far, best matches first."""
+        terms = [term for term in re.findall(r"\w+", text.lower()) if term not in STOPWORDS]
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        where, params = [f"{kind}_fts MATCH ?"], [match]
+        if kind == "issues":
+            if state:
+                where.append("t.state = ?")
+                params.append(state)
+            if assigned is not None:
+                where.append("t.assigned = ?")
+                params.append(int(assigned))
+        else:
+            if language:
+                where.append("t.language = ?")
+                params.append(language)
+            where.append("t.stars >= ?")
+            params.append(min_stars)
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT t.item FROM {kind}_fts f JOIN {kind} t ON t.id = f.rowid "
+                f"WHERE {' AND '.join(where)} ORDER BY bm25({kind}_fts) LIMIT ?",
+                params,
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _upsert_repo(self, repo):
+        self._db.execute(
+            "INSERT OR REPLACE INTO repos (id, full_name, language, stars, forks, pushed_at, updated_at, item) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (repo["id"], repo.get("full_name"), repo.get("language"), repo.get("stargazers_count", 0),
+             repo.get("forks_count", 0), repo.get("pushed_at"), repo.get("updated_at"), json.dumps(repo)),
+        )
+        self._db.execute("DELETE FROM repos_fts WHERE rowid = ?", (repo["id"],))
+        self._db.execute(
+            "INSERT INTO repos_fts (rowid, full_name, description, topics, language) VALUES (?, ?, ?, ?, ?)",
+            (repo["id"], repo.get("full_name") or "", repo.get("description") or "",
+             " ".join(repo.get("topics") or []), repo.get("language") or ""),
+        )
+
+    def _upsert_issue(self, issue):
+        labels = [label["name"] for label in issue.get("labels") or []]
+        self._db.execute(
+            "INSERT OR REPLACE INTO issues "
+            "(id, repository, labels, state, assigned, comments, created_at, updated_at, item) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (issue["id"], issue.get("repository_url"), json.dumps(labels), issue.get("state"),
+             int(bool(issue.get("assignees"))), issue.get("comments", 0), issue.get("created_at"),
+             issue.get("updated_at"), json.dumps(issue)),
+        )
+        self._db.execute("DELETE FROM issues_fts WHERE rowid = ?", (issue["id"],))
+        self._db.execute(
+            "INSERT INTO issues_fts (rowid, title, body, labels) VALUES (?, ?, ?, ?)",
+            (issue["id"], issue.get("title") or "", issue.get("body") or "", " ".join(labels)),
+        )
+
+
+def sort_label(sort_by, order):
+    """How a search's results were ordered; best match ignores `order`."""
+    return f"{sort_by}:{order}" if sort_by else "best-match"
+
+
+search_index = SearchIndex(cache_path("search_index.sqlite3"))
@@ -0,0 +1,209 @@
+import os
+import re
+import threading
+import zlib
+
+from utils.cache import cache_path
+from utils.prompt_parser import STOPWORDS
+
+
+# Terms are hashed into this many buckets (a power of two), so the vocabulary never needs storing
+N_FEATURES = 2 ** 18
+# Only the start of long issue bodies is indexed; titles count twice
+MAX_BODY_CHARS = 4000
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+# Each add is saved as one small segment file; past this many they are merged into one
+MAX_SEGMENTS = 32
+SEGMENT = re.compile(r"segment-(\d+)\.npz$")
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords; a plural "s" is dropped so "animations" meets "animation"."""
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def hash_terms(tokens):
+    """Bucket ids and sublinear term frequencies (1 + log tf) of a token list, as NumPy arrays."""
+    import numpy as np
+
+    buckets = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint32, count=len(tokens))
+    terms, counts = np.unique(buckets & (N_FEATURES - 1), return_counts=True)
+    return terms.astype(np.int32), (1 + np.log(counts)).astype(np.float32)
+
+
+class IssueVectorIndex:
+    """
+    In-process TF-IDF index over issue titles and bodies, using the hashing trick instead of a
+    vocabulary. Documents are kept as flat COO arrays (row, term bucket, tf weight) plus
+    per-bucket document frequencies; IDF is applied at query time, so adding issues never
+    re-weights the ones already indexed. With a `directory`, every add is appended as one
+    segment file (written, then renamed into place); segments are replayed in order on load,
+    later versions of an issue replacing earlier ones, and merged once there are MAX_SEGMENTS.
+    """
+
+    def __init__(self, directory=None):
+        import numpy as np
+
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._norms = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.terms = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.df = np.zeros(N_FEATURES, dtype=np.int32)
+        self._segments = self._load() if directory else []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, issues):
+        """Index new issues and re-index ones already present (e.g. after an edit)."""
+        docs = {}
+        for issue in issues:
+            text = " ".join([issue.get("title") or ""] * 2 + [(issue.get("body") or "")[:MAX_BODY_CHARS]])
+            tokens = tokenize(text)
+            if tokens:
+                docs[issue["id"]] = hash_terms(tokens)
+        if not docs:
+            return
+
+        with self._lock:
+            self._apply(docs)
+            self._save(docs)
+
+    def _apply(self, docs):
+        """Merge {issue id: (term buckets, tf weights)} into the arrays; the caller holds the lock."""
+        import numpy as np
+
+        ids, rows, terms, weights = self.ids, self.rows, self.terms, self.weights
+        # Drop the previous version of re-indexed issues, then renumber the remaining rows
+        replaced = np.isin(ids, list(docs))
+        if replaced.any():
+            keep = ~replaced[rows]
+            np.subtract.at(self.df, terms[~keep], 1)
+            renumber = np.cumsum(~replaced) - 1
+            ids, rows, terms, weights = ids[~replaced], renumber[rows[keep]].astype(np.int32), terms[keep], weights[keep]
+
+        new_rows = [np.full(len(doc_terms), len(ids) + i, dtype=np.int32) for i, (doc_terms, _) in enumerate(docs.values())]
+        new_terms = [doc_terms for doc_terms, _ in docs.values()]
+        new_weights = [doc_weights for _, doc_weights in docs.values()]
+        np.add.at(self.df, np.concatenate(new_terms), 1)
+
+        self.ids = np.concatenate([ids, np.fromiter(docs, dtype=np.int64, count=len(docs))])
+        self.rows = np.concatenate([rows, *new_rows])
+        self.terms = np.concatenate([terms, *new_terms])
+        self.weights = np.concatenate([weights, *new_weights])
+        self._norms = None
+
+    def search(self, text, k=20):
+        """Top-k issues by cosine similarity to `text`, as a list of (issue id, score), best first."""
+        import numpy as np
+
+        tokens = tokenize(text)
+        with self._lock:
+            if not tokens or not len(self.ids):
+                return []
+            idf = self._idf()
+            if self._norms is None:
+                self._norms = np.sqrt(np.bincount(self.rows, weights=(self.weights * idf[self.terms]) ** 2,
+                                                  minlength=len(self.ids)))
+            query_terms, query_weights = hash_terms(tokens)
+            query = np.zeros(N_FEATURES, dtype=np.float32)
+            query[query_terms] = query_weights * idf[query_terms]
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                return []
+
+            # Only entries whose bucket appears in the query contribute to the dot products
+            hit = query[self.terms] != 0
+            dots = np.bincount(self.rows[hit], weights=self.weights[hit] * idf[self.terms[hit]] * query[self.terms[hit]],
+                               minlength=len(self.ids))
+            scores = dots / (np.where(self._norms > 0, self._norms, 1.0) * query_norm)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def _idf(self):
+        import numpy as np
+
+        return np.log((1 + len(self.ids)) / (1 + np.asarray(self.df, dtype=np.float32))) + 1
+
+    def _file(self, seq):
+        return os.path.join(self.directory, f"segment-{seq:08d}.npz")
+
+    def _load(self):
+        """Replay the segment files in order; returns their sequence numbers. Unreadable segments are skipped."""
+        import numpy as np
+
+        if not os.path.isdir(self.directory):
+            return []
+        segments = sorted(int(match.group(1)) for match in map(SEGMENT.match, os.listdir(self.directory)) if match)
+        for seq in segments:
+            try:
+                with np.load(self._file(seq)) as segment:
+                    ids, rows, terms, weights = (segment[name] for name in ("ids", "rows", "terms", "weights"))
+            except (OSError, ValueError, KeyError):
+                continue
+            if not (len(rows) == len(terms) == len(weights) and np.all(rows[:-1] <= rows[1:])
+                    and (not len(rows) or 0 <= rows[0] and rows[-1] < len(ids))
+                    and np.all((terms >= 0) & (terms < N_FEATURES))):
+                continue
+            bounds = np.searchsorted(rows, np.arange(len(ids) + 1))
+            self._apply({int(issue_id): (terms[start:end], weights[start:end])
+                         for issue_id, start, end in zip(ids, bounds[:-1], bounds[1:]) if end > start})
+        return segments
+
+    def _save(self, docs):
+        """Append `docs` as a new segment; the caller holds the lock."""
+        import numpy as np
+
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if len(self._segments) + 1 >= MAX_SEGMENTS:
+            # Merge everything into one segment; older ones it replaces are removed afterwards,
+            # and replaying them after a crash in between changes nothing
+            self._write(self.ids, self.rows, self.terms, self.weights)
+            merged, self._segments = self._segments, self._segments[-1:]
+            for seq in merged[:-1]:
+                os.remove(self._file(seq))
+            return
+        self._write(
+            np.fromiter(docs, dtype=np.int64, count=len(docs)),
+            np.concatenate([np.full(len(doc_terms), i, dtype=np.int32) for i, (doc_terms, _) in enumerate(docs.values())]),
+            np.concatenate([doc_terms for doc_terms, _ in docs.values()]),
+            np.concatenate([doc_weights for _, doc_weights in docs.values()]),
+        )
+
+    def _write(self, ids, rows, terms, weights):
+        import numpy as np
+
+        seq = self._segments[-1] + 1 if self._segments else 0
+        # Write then rename, so a segment is either complete or absent
+        tmp = self._file(seq) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=ids, rows=rows, terms=terms, weights=weights)
+        os.replace(tmp, self._file(seq))
+        self._segments.append(seq)
+
+
+_issue_vectors = None
+_issue_vectors_lock = threading.Lock()
+
+def get_issue_vectors():
+    """The shared issue index, created on first use so NumPy isn't imported at startup."""
+    global _issue_vectors
+    if _issue_vectors is None:
+        with _issue_vectors_lock:
+            if _issue_vectors is None:
+                _issue_vectors = IssueVectorIndex(cache_path("issue_vectors"))
+    return _issue_vectors